@@ -1,8 +1,22 @@
-from PySide6.QtWidgets import QProgressDialog
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QThread, Signal
 
 import sys
+import time
+from collections import deque
+from pathlib import Path
 import cv2
+import numpy as np
+
+from tools import extraction
+from tools import video_index
+from tools.extraction_manifest import ExtractionManifest
+from tools.frame_source import FolderFrameSource
+from tools.image_resize import create_output_folders, resize_to_display
+from tools.image_writer import ImageWriterPool
+from tools.annotation_store import AnnotationStore
+from tools.project_database import ProjectDatabase
+from tools.project_manifest import scan_projects
+from tools.proxy_store import ProxyStore, thumbnail_size
 
 
 style_colors = {
@@ -18,61 +32,506 @@ style_colors = {
 }
 
 
-def open_video(source_file: str):
-    cap = cv2.VideoCapture(source_file)
+def probe_video(source_file: str):
+    """ Read video metadata from the container
+
+    Only the container header is read, so opening a project doesn't wait
+    for the whole file. The frame count reported by the container can be
+    wrong (variable frame rate, damaged files); the exact values are
+    computed with indexed_video_properties() once the packet index is
+    built in the background by VideoIndexing.
+
+    Parameters
+    ----------
+    source_file: str
+        Video file path
+
+    Returns
+    -------
+    dict
+        width, height, fps, frame_count, reported_frame_count, codec and
+        duration (seconds). 0 if the video can't be opened
+    """
+    cap = cv2.VideoCapture(str(source_file), cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        cap = cv2.VideoCapture(str(source_file))
     if not cap.isOpened():
         print('Error opening video stream or file')
         return 0
 
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
     video_properties = {
         'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
         'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-        'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
-        'fps': float(cap.get(cv2.CAP_PROP_FPS))
+        'reported_frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        'fps': float(cap.get(cv2.CAP_PROP_FPS)),
+        'codec': fourcc.to_bytes(4, 'little').decode('ascii', errors='replace').strip('\x00')
     }
-
     cap.release()
 
+    video_properties['frame_count'] = video_properties['reported_frame_count']
+    video_properties['duration'] = (video_properties['frame_count'] / video_properties['fps']
+                                    if video_properties['fps'] > 0 else 0.0)
+
     return video_properties
 
 
-def frame_extraction(source_file: str, frames_folder: str, labeled_folder: str, resized_folder: str, frame_extraction: int) -> int:
-    cap = cv2.VideoCapture(source_file)
-    if not cap.isOpened():
-        print('Error opening video stream or file')
-        return 0
-    
-    frame_progress_bar = QProgressDialog(
-        labelText = 'Extrayendo frames...',
-        cancelButtonText = 'Cancelar', 
-        minimum = 0, 
-        maximum = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    )
-    frame_progress_bar.setWindowModality(Qt.WindowModality.WindowModal)
-    
-    frame_number = 0
-    image_number = 0
-    while(cap.isOpened()):
-        frame_progress_bar.setValue(frame_number)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        ret, frame = cap.read()
-        if not ret or frame_progress_bar.wasCanceled():
-            break
-        
-        frame_text = f'{image_number}'.zfill(6)
-        frame_image = f'{frames_folder}/image_{frame_text}.png'
-        cv2.imwrite(frame_image, frame)
-
-        label_file = open(f'{labeled_folder}/image_{frame_text}.txt', 'x')
-        label_file.close()
-        
-        resized_image = f'{resized_folder}/image_{frame_text}.png'
-        resized_frame = cv2.resize(frame, [416, 416], interpolation= cv2.INTER_LINEAR)
-        cv2.imwrite(resized_image, resized_frame)
-        
-        frame_number += frame_extraction
-        image_number += 1
+def indexed_video_properties(video_properties: dict, frame_index: dict) -> dict:
+    """ Video metadata completed with the packet index
+
+    The frame count, duration and frame rate are taken from the packet
+    timestamps, which are also correct for variable frame rate videos.
+
+    Returns
+    -------
+    dict
+        The probed properties with the exact frame_count, duration and
+        fps, and variable_frame_rate, keyframe_count, gop_size and
+        max_gop_size
+    """
+    video_properties = dict(video_properties)
+    timestamps = frame_index['timestamp']
+    if len(timestamps) == 0:
+        video_properties.update(variable_frame_rate=False, keyframe_count=0, gop_size=0.0, max_gop_size=0)
+        return video_properties
+
+    frame_count = len(timestamps)
+    frame_duration = np.diff(timestamps)
+    if len(frame_duration) > 0:
+        median_duration = float(np.median(frame_duration))
+        variable_frame_rate = bool(np.any(np.abs(frame_duration - median_duration) > 0.5 * median_duration))
+        duration = (timestamps[-1] - timestamps[0] + median_duration) / 1000
+    else:
+        variable_frame_rate = False
+        duration = frame_count / video_properties['fps'] if video_properties['fps'] > 0 else 0.0
+
+    video_properties.update({
+        'frame_count': frame_count,
+        'duration': float(duration),
+        'variable_frame_rate': variable_frame_rate
+    })
+    video_properties.update(video_index.gop_structure(frame_index))
+    if variable_frame_rate and duration > 0:
+        video_properties['fps'] = frame_count / duration
+
+    return video_properties
+
+
+def save_project_data(project_path: str, project_data: dict) -> None:
+    """ Save project metadata in the project database """
+    with ProjectDatabase(project_path) as database:
+        database.save_metadata(project_data)
+
+
+def load_project_data(project_path: str) -> dict:
+    """ Load project metadata from the project database """
+    with ProjectDatabase(project_path) as database:
+        return database.load_metadata()
+
+
+def images_written(futures: list) -> bool:
+    """ True if every image of a frame was written without errors """
+    return all(future.exception() is None for future in futures)
+
+
+class FrameExtraction(QThread):
+    """ Background frame extraction
+
+    Signals
+    -------
+    progress: (int, int)
+        Current source frame number and total frames of the video
+    throughput: float
+        Extracted frames per second
+    eta: float
+        Estimated remaining time in seconds
+    images_ready: int
+        Number of contiguous images available from image 0
+    proxies_ready: int
+        Number of proxy thumbnails available from image 0
+    extraction_finished: int
+        Total number of extracted images
+    extraction_failed: str
+        Error that stopped the extraction, emitted instead of extraction_finished
+    """
+    progress = Signal(int, int)
+    throughput = Signal(float)
+    eta = Signal(float)
+    images_ready = Signal(int)
+    proxies_ready = Signal(int)
+    extraction_finished = Signal(int)
+    extraction_failed = Signal(str)
+
+    # Minimum time between two progress updates to avoid flooding the GUI
+    REPORT_INTERVAL = 0.1
+    # Time between two saves of the extraction manifest
+    CHECKPOINT_INTERVAL = 2.0
+
+    def __init__(self, source_file: str, frames_folder: str, resized_folder: str,
+                 frame_extraction: int, strategy: str = 'auto', workers: int = 1, project_path: str = None,
+                 image_settings: dict = None, frame_count: int = None, proxy_store: ProxyStore = None) -> None:
+        super().__init__()
+        self.source_file = str(source_file)
+        self.frames_folder = frames_folder
+        self.resized_folder = resized_folder
+        self.frame_extraction = frame_extraction
+        self.strategy = strategy
+        self.workers = workers
+        self.project_path = project_path
+        self.image_settings = image_settings
+        # Exact frame count from the cached video metadata
+        self.frame_count = frame_count
+        # Proxy thumbnails made from the decoded frames (serial extraction)
+        self.proxy_store = proxy_store
+        self.proxy_size = None
+
+        self.manifest = None
+        self.images_resumed = 0
+        self.start_time = 0.0
+        self.last_report = 0.0
+        self.last_checkpoint = 0.0
+
+
+    def run(self) -> None:
+        try:
+            self.extract()
+        except Exception as error:
+            # The images written so far stay in the manifest, the next attempt resumes
+            print(f'Frame extraction error: {error}')
+            if self.manifest is not None:
+                self.manifest.finished = False
+                self.manifest.save()
+            self.extraction_failed.emit(str(error))
+
+
+    def extract(self) -> None:
+        # Checkpoint of the written images to resume interrupted extractions.
+        # It is saved before the first frame is written, so an extraction
+        # interrupted at any point is resumed on the next attempt.
+        self.manifest = ExtractionManifest(self.project_path or Path(self.frames_folder).parent,
+                                           self.source_file, self.frame_extraction)
+        self.manifest.save()
+
+        cap = None
+        frame_count = self.frame_count
+        if self.workers == 1 or frame_count is None:
+            cap = cv2.VideoCapture(self.source_file)
+            if not cap.isOpened():
+                print('Error opening video stream or file')
+                self.extraction_finished.emit(0)
+                return
+            if frame_count is None:
+                frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        create_output_folders(self.resized_folder, extraction.image_output_sizes(self.image_settings))
+
+        total_images = -(-frame_count // max(1, self.frame_extraction))
+        image_ranges = self.manifest.missing_ranges(total_images)
+        self.images_resumed = self.manifest.image_count()
+        self.last_checkpoint = time.perf_counter()
+
+        self.start_time = time.perf_counter()
+        self.last_report = 0.0
+        if self.workers != 1:
+            if cap is not None:
+                cap.release()
+            image_number = self.run_parallel(frame_count, image_ranges)
+            strategy = 'parallel'
+        else:
+            image_number, strategy = self.run_serial(cap, frame_count, image_ranges)
+            cap.release()
+        if self.proxy_store is not None:
+            self.proxy_store.flush()
+
+        self.manifest.finished = not self.isInterruptionRequested()
+        self.manifest.save()
+
+        elapsed = time.perf_counter() - self.start_time
+        self.report(frame_count, frame_count, image_number, force=True)
+        print(f"Frame extraction ({strategy}): {image_number} frames in {elapsed:.1f} s, {image_number / max(elapsed, 1e-6):.1f} frames/s")
+        self.extraction_finished.emit(self.manifest.contiguous_images())
+
+
+    def run_serial(self, cap: cv2.VideoCapture, frame_count: int, image_ranges: list) -> tuple:
+        image_count = 0
+        queued_images = deque()
+        extraction_stats = {'strategy': self.strategy}
+        writer = ImageWriterPool()
+        try:
+            for first_image, last_image in image_ranges:
+                start = first_image * self.frame_extraction
+                stop = last_image * self.frame_extraction if last_image is not None else None
+                for frame_number, frame in extraction.read_frames(cap, self.frame_extraction, start=start, stop=stop,
+                                                                  strategy=self.strategy, stats=extraction_stats):
+                    if self.isInterruptionRequested():
+                        break
+                    image_number = frame_number // self.frame_extraction
+                    queued_images.append((image_number, extraction.write_frame_images(frame, image_number,
+                        self.frames_folder, self.resized_folder, self.image_settings, writer)))
+                    self.write_proxy(image_number, frame)
+                    image_count += 1
+
+                    # Only images already on disk can be browsed
+                    while queued_images and all(future.done() for future in queued_images[0][1]):
+                        written_image, futures = queued_images.popleft()
+                        if images_written(futures):
+                            self.checkpoint(written_image, 1)
+                    self.report(frame_number, frame_count, image_count, force=(image_count == 1))
+
+                if self.isInterruptionRequested():
+                    break
+        finally:
+            writer.shutdown()
+
+            # Pending images are on disk once the writer pool is shut down
+            for written_image, futures in queued_images:
+                if images_written(futures):
+                    self.manifest.add_range(written_image, written_image + 1)
+
+        # Images that failed are missing in the manifest, a resume writes them again
+        if writer.errors:
+            raise writer.errors[0]
+
+        return image_count, extraction_stats['strategy']
+
+
+    def run_parallel(self, frame_count: int, image_ranges: list) -> int:
+        # Segments aligned with the cached keyframe index seek cheaply. Without
+        # a cache the segments are split by frame count, the packet scan is
+        # left to the background indexing
+        keyframes = None
+        if self.project_path is not None:
+            frame_index = video_index.cached_video_index(self.source_file, self.project_path)
+            if frame_index is not None:
+                keyframes = video_index.keyframes(frame_index)
+
+        def parallel_progress(image_count: int) -> bool:
+            frame_number = min((self.images_resumed + image_count) * self.frame_extraction, frame_count)
+            self.report(frame_number, frame_count, image_count)
+            return not self.isInterruptionRequested()
+
+        return extraction.parallel_extraction(self.source_file, self.frames_folder, self.resized_folder,
+            self.frame_extraction, frame_count, workers=self.workers, keyframes=keyframes, image_settings=self.image_settings, image_ranges=image_ranges, segment_done=self.checkpoint,
+            progress=parallel_progress)
+
+
+    def write_proxy(self, image_number: int, frame: np.ndarray) -> None:
+        """ Proxy thumbnail of a decoded frame, so the video isn't decoded again for it """
+        if self.proxy_store is None or image_number >= len(self.proxy_store):
+            return
+        if self.proxy_size is None:
+            self.proxy_size = thumbnail_size(frame.shape[1], frame.shape[0])
+        self.proxy_store.write(image_number, resize_to_display(frame, self.proxy_size))
+
+
+    def checkpoint(self, start_image: int, image_count: int) -> None:
+        """ Record written images and save the manifest periodically """
+        self.manifest.add_range(start_image, start_image + image_count)
+        if time.perf_counter() - self.last_checkpoint >= self.CHECKPOINT_INTERVAL:
+            self.manifest.save()
+            self.last_checkpoint = time.perf_counter()
+
+
+    def report(self, frame_number: int, frame_count: int, image_count: int, force: bool = False) -> None:
+        """ Emit progress, throughput, ETA and available images """
+        elapsed = time.perf_counter() - self.start_time
+        if not force and elapsed - self.last_report < self.REPORT_INTERVAL:
+            return
+        self.last_report = elapsed
+
+        frames_per_second = image_count / elapsed if elapsed > 0 else 0.0
+        remaining_images = max(0, frame_count - frame_number) / max(1, self.frame_extraction)
+        self.progress.emit(frame_number, frame_count)
+        self.throughput.emit(frames_per_second)
+        self.eta.emit(remaining_images / frames_per_second if frames_per_second > 0 else 0.0)
+        self.images_ready.emit(self.manifest.contiguous_images())
+        if self.proxy_store is not None:
+            self.proxies_ready.emit(self.proxy_store.ready_images())
+
+
+class ProxyGeneration(QThread):
+    """ Background generation of the proxy thumbnails of a project
+
+    Projects read directly from the video decode it once from the first
+    missing thumbnail, so an interrupted generation continues where it
+    stopped. Projects with extracted frames read the missing thumbnails
+    from the extracted images (frame_source) instead of the video.
+
+    Signals
+    -------
+    proxies_ready: int
+        Number of thumbnails available from image 0
+    """
+    proxies_ready = Signal(int)
+
+    REPORT_INTERVAL = 0.2
+
+    def __init__(self, source_file: str, proxy_store: ProxyStore, frame_extraction: int,
+                 frame_source: FolderFrameSource = None, image_count: int = None) -> None:
+        super().__init__()
+        self.source_file = str(source_file)
+        self.proxy_store = proxy_store
+        self.frame_extraction = max(1, int(frame_extraction))
+        # Extracted images and number of them on disk
+        self.frame_source = frame_source
+        self.image_count = image_count
+
+
+    def run(self) -> None:
+        if self.frame_source is not None:
+            self.read_images()
+        else:
+            self.decode_video()
+        self.proxy_store.flush()
+        self.proxies_ready.emit(self.proxy_store.ready_images())
+
+
+    def read_images(self) -> None:
+        """ Thumbnails of the extracted images missing in the store """
+        proxy_size = thumbnail_size(*self.frame_source.frame_size)
+        last_report = time.perf_counter()
+        for image_number in self.proxy_store.missing_images(self.image_count):
+            if self.isInterruptionRequested():
+                break
+            thumbnail = self.frame_source.read(int(image_number), proxy_size)
+            if thumbnail is not None:
+                self.proxy_store.write(image_number, thumbnail)
+            if time.perf_counter() - last_report >= self.REPORT_INTERVAL:
+                self.proxies_ready.emit(self.proxy_store.ready_images())
+                last_report = time.perf_counter()
+
+
+    def decode_video(self) -> None:
+        """ Thumbnails of the video frames from the first missing one """
+        first_image = self.proxy_store.ready_images()
+        if first_image >= len(self.proxy_store):
+            return
+
+        cap = cv2.VideoCapture(self.source_file)
+        if not cap.isOpened():
+            print('Error opening video stream or file')
+            return
+        proxy_size = thumbnail_size(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+        image_number = first_image
+        last_report = time.perf_counter()
+        for frame_number, frame in extraction.read_frames(cap, self.frame_extraction,
+                                                          start=first_image * self.frame_extraction):
+            if self.isInterruptionRequested():
+                break
+            image_number = frame_number // self.frame_extraction
+            if image_number >= len(self.proxy_store):
+                break
+            self.proxy_store.write(image_number, resize_to_display(frame, proxy_size))
+            if time.perf_counter() - last_report >= self.REPORT_INTERVAL:
+                self.proxies_ready.emit(image_number + 1)
+                last_report = time.perf_counter()
+        cap.release()
+
+
+class OutputSizeGeneration(QThread):
+    """ Background generation of output sizes added to an extracted project
+
+    The new sizes are resized from the full size frames, the video is not
+    decoded again. Images that already exist are skipped, so an
+    interrupted generation continues where it stopped.
+
+    Signals
+    -------
+    generation_finished: int
+        Number of images written, not emitted if the generation is interrupted
+    """
+    generation_finished = Signal(int)
+
+    def __init__(self, frames_folder: str, resized_folder: str, output_sizes: list, image_settings: dict) -> None:
+        super().__init__()
+        self.frames_folder = frames_folder
+        self.resized_folder = resized_folder
+        self.output_sizes = output_sizes
+        self.image_settings = image_settings
+
+
+    def run(self) -> None:
+        image_count = extraction.generate_output_sizes(self.frames_folder, self.resized_folder, self.output_sizes,
+            self.image_settings, progress=lambda frame_count: not self.isInterruptionRequested())
+        if not self.isInterruptionRequested():
+            self.generation_finished.emit(image_count)
+
+
+class VideoIndexing(QThread):
+    """ Background load of the packet index of the project video
+
+    The index is read from the project folder, or built by scanning the
+    packets of the video and cached there the first time.
+
+    Signals
+    -------
+    video_indexed: dict
+        Video index arrays, not emitted if the scan is interrupted
+    """
+    video_indexed = Signal(object)
+
+    def __init__(self, source_file: str, project_path: str) -> None:
+        super().__init__()
+        self.source_file = str(source_file)
+        self.project_path = project_path
+
+
+    def run(self) -> None:
+        frame_index = video_index.load_video_index(self.source_file, self.project_path,
+                                                   interrupted=self.isInterruptionRequested)
+        if frame_index is not None:
+            self.video_indexed.emit(frame_index)
+
+
+class AnnotationExport(QThread):
+    """ Background export of the annotations of a project
+
+    Writes a YOLO label file for every image in 'labels' and all the boxes
+    in '<project name>.csv' inside the export folder.
+
+    Signals
+    -------
+    export_finished: str
+        Export folder
+    """
+    export_finished = Signal(str)
+
+    def __init__(self, annotation_store: AnnotationStore, export_folder: str, project_name: str,
+                 total_images: int, class_names: list) -> None:
+        super().__init__()
+        self.annotation_store = annotation_store
+        self.export_folder = Path(export_folder)
+        self.project_name = project_name
+        self.total_images = total_images
+        self.class_names = class_names
+
+
+    def run(self) -> None:
+        self.annotation_store.export_yolo(self.export_folder / 'labels', self.total_images)
+        self.annotation_store.export_csv(self.export_folder / f'{self.project_name}.csv', self.class_names)
+        self.export_finished.emit(str(self.export_folder))
+
+
+class ProjectScan(QThread):
+    """ Background refresh of the cached manifests of a projects location
+
+    Signals
+    -------
+    projects_scanned: (str, dict)
+        Projects location and its catalog entries
+    """
+    projects_scanned = Signal(str, object)
+
+    def __init__(self, project_folder: str, cached_projects: dict) -> None:
+        super().__init__()
+        self.project_folder = str(project_folder)
+        self.cached_projects = cached_projects
 
-    cap.release()
 
-    return image_number
\ No newline at end of file
+    def run(self) -> None:
+        try:
+            projects = scan_projects(self.project_folder, self.cached_projects)
+        except OSError:
+            print(f'Error scanning the projects folder {self.project_folder}')
+            return
+        self.projects_scanned.emit(self.project_folder, projects)
@@ -0,0 +1,224 @@
+"""
+PySide6 Filmstrip component adapted to follow Material Design 3 guidelines
+
+"""
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PySide6.QtWidgets import QWidget
+from PySide6.QtGui import QImage, QPixmap, QPainter, QColor, QPen
+from PySide6.QtCore import Qt, QRect
+
+# ---------
+# Filmstrip
+# ---------
+class MD3Filmstrip(QWidget):
+    THUMBNAIL_HEIGHT = 48
+    SPACING = 4
+    # Thumbnails per sprite sheet and sprite sheets kept in memory
+    SHEET_COLUMNS = 8
+    SHEET_ROWS = 8
+    MAX_SHEETS = 16
+
+    LABELED_COLOR = QColor(162, 191, 138)
+    UNLABELED_COLOR = QColor(193, 96, 105)
+    CURRENT_COLOR = QColor(237, 204, 135)
+    LABELED_BGRA = np.array([138, 191, 162, 255], dtype=np.uint8)
+    UNLABELED_BGRA = np.array([105, 96, 193, 255], dtype=np.uint8)
+
+    def __init__(self, parent, attributes: dict) -> None:
+        """ Material Design 3 Component: Filmstrip
+
+        Strip of thumbnails of the project images. Only the visible range
+        is painted, from sprite sheets of SHEET_COLUMNS x SHEET_ROWS
+        thumbnails, so it doesn't create any widget per image. Every
+        thumbnail shows its number of boxes, and an overview bar under
+        the strip marks the labeled (green) and unlabeled (red) parts of
+        the whole project.
+
+        Parameters
+        ----------
+        attributes: dict
+            position: tuple
+                Filmstrip top left corner position
+                (x, y)
+            size: tuple
+                Filmstrip size
+                (w, h) -> w: width, h: height
+            thumbnail: def
+                Method returning the thumbnail (np.ndarray) of an image
+                number, or None if it isn't available
+            box_count: def
+                Method returning the number of boxes of an image number
+            labeled_images: def
+                Method returning the sorted labeled image numbers
+            frame_selected: def
+                Filmstrip 'frame selected' method name, receives the
+                clicked image number
+
+        Returns
+        -------
+        None
+        """
+        super(MD3Filmstrip, self).__init__(parent)
+
+        self.attributes = attributes
+        self.parent = parent
+
+        x, y = attributes['position'] if 'position' in attributes else (8,8)
+        w, h = attributes['size'] if 'size' in attributes else (96, 72)
+        self.setGeometry(x, y, w, h)
+
+        self.image_count = 0
+        self.current_image = 0
+        self.first_image = 0
+        self.thumbnail_width = self.THUMBNAIL_HEIGHT
+        self.thumbnails_ready = 0
+        # sheet number: (pixmap, thumbnails in the sheet)
+        self.sheets = OrderedDict()
+        self.overview = None
+
+
+    # ------
+    # Images
+    # ------
+    def set_image_count(self, image_count: int, aspect_ratio: float = None) -> None:
+        self.image_count = image_count
+        if aspect_ratio is not None:
+            self.thumbnail_width = max(1, round(self.THUMBNAIL_HEIGHT * aspect_ratio))
+            self.sheets.clear()
+        self.overview = None
+        self.update()
+
+
+    def set_thumbnails_ready(self, thumbnails_ready: int) -> None:
+        """ Thumbnails available from image 0, incomplete sheets are rebuilt """
+        self.thumbnails_ready = thumbnails_ready
+        self.update()
+
+
+    def set_current(self, image_number: int) -> None:
+        """ Highlight the current image and scroll to keep it visible """
+        self.current_image = image_number
+        visible_count = self.visible_count()
+        if not self.first_image <= image_number < self.first_image + visible_count:
+            self.scroll_to(image_number - visible_count // 2)
+        self.update()
+
+
+    def invalidate_annotations(self) -> None:
+        """ Recompute the overview bar after an annotation change """
+        self.overview = None
+        self.update()
+
+
+    def visible_count(self) -> int:
+        return max(1, self.width() // (self.thumbnail_width + self.SPACING) + 1)
+
+
+    def scroll_to(self, first_image: int) -> None:
+        self.first_image = int(min(max(first_image, 0), max(0, self.image_count - self.visible_count() + 1)))
+        self.update()
+
+
+    # -------------
+    # Sprite sheets
+    # -------------
+    def sheet(self, sheet_number: int) -> QPixmap:
+        """ Sprite sheet of a block of images, built when missing or incomplete """
+        sheet_images = self.SHEET_COLUMNS * self.SHEET_ROWS
+        first_image = sheet_number * sheet_images
+        available = min(max(0, self.thumbnails_ready - first_image), sheet_images, self.image_count - first_image)
+
+        if sheet_number in self.sheets and self.sheets[sheet_number][1] >= available:
+            self.sheets.move_to_end(sheet_number)
+            return self.sheets[sheet_number][0]
+
+        sheet_array = np.zeros((self.SHEET_ROWS * self.THUMBNAIL_HEIGHT, self.SHEET_COLUMNS * self.thumbnail_width, 4),
+                               dtype=np.uint8)
+        for slot in range(available):
+            thumbnail = self.attributes['thumbnail'](first_image + slot)
+            if thumbnail is None:
+                continue
+            row, column = divmod(slot, self.SHEET_COLUMNS)
+            top, left = row * self.THUMBNAIL_HEIGHT, column * self.thumbnail_width
+            thumbnail = cv2.resize(thumbnail, (self.thumbnail_width, self.THUMBNAIL_HEIGHT), interpolation=cv2.INTER_AREA)
+            sheet_array[top:top + self.THUMBNAIL_HEIGHT, left:left + self.thumbnail_width] = cv2.cvtColor(
+                thumbnail, cv2.COLOR_BGR2BGRA)
+
+        # QPixmap.fromImage copies the pixels, the array is not kept
+        sheet_image = QImage(sheet_array.data, sheet_array.shape[1], sheet_array.shape[0], sheet_array.strides[0],
+                             QImage.Format.Format_RGB32)
+        self.sheets[sheet_number] = (QPixmap.fromImage(sheet_image), available)
+        self.sheets.move_to_end(sheet_number)
+        while len(self.sheets) > self.MAX_SHEETS:
+            self.sheets.popitem(last=False)
+
+        return self.sheets[sheet_number][0]
+
+
+    def overview_columns(self) -> np.ndarray:
+        """ True for the overview bar columns with labeled images """
+        if self.overview is None or len(self.overview) != self.width():
+            labeled_images = np.asarray(self.attributes['labeled_images'](), dtype=np.int64)
+            labeled_images = labeled_images[labeled_images < self.image_count]
+            columns = labeled_images * self.width() // max(1, self.image_count)
+            self.overview = np.bincount(columns, minlength=self.width())[:self.width()] > 0
+        return self.overview
+
+
+    # ------
+    # Events
+    # ------
+    def paintEvent(self, event) -> None:
+        painter = QPainter(self)
+        sheet_images = self.SHEET_COLUMNS * self.SHEET_ROWS
+        step = self.thumbnail_width + self.SPACING
+        last_image = min(self.first_image + self.visible_count(), self.image_count)
+
+        for image_number in range(self.first_image, last_image):
+            left = (image_number - self.first_image) * step
+            target = QRect(left, 0, self.thumbnail_width, self.THUMBNAIL_HEIGHT)
+            sheet_number, slot = divmod(image_number, sheet_images)
+            row, column = divmod(slot, self.SHEET_COLUMNS)
+            painter.drawPixmap(target, self.sheet(sheet_number), QRect(column * self.thumbnail_width,
+                               row * self.THUMBNAIL_HEIGHT, self.thumbnail_width, self.THUMBNAIL_HEIGHT))
+
+            box_count = self.attributes['box_count'](image_number)
+            painter.fillRect(QRect(left, self.THUMBNAIL_HEIGHT + 2, self.thumbnail_width, 3),
+                             self.LABELED_COLOR if box_count > 0 else self.UNLABELED_COLOR)
+            if box_count > 0:
+                painter.fillRect(QRect(left, 0, 24, 14), QColor(0, 0, 0, 160))
+                painter.setPen(self.LABELED_COLOR)
+                painter.drawText(QRect(left, 0, 24, 14), Qt.AlignmentFlag.AlignCenter, f'{box_count}')
+            if image_number == self.current_image:
+                painter.setPen(QPen(self.CURRENT_COLOR, 2))
+                painter.drawRect(target.adjusted(1, 1, -1, -1))
+
+        # Overview of the labeled images of the whole project
+        overview_top = self.height() - 6
+        overview_colors = np.where(self.overview_columns()[:, None], self.LABELED_BGRA, self.UNLABELED_BGRA)
+        overview_array = np.ascontiguousarray(np.broadcast_to(overview_colors, (6, self.width(), 4)))
+        painter.drawImage(0, overview_top, QImage(overview_array.data, self.width(), 6, overview_array.strides[0],
+                                                  QImage.Format.Format_RGB32))
+        if self.image_count > 0:
+            painter.setPen(self.CURRENT_COLOR)
+            current_column = self.current_image * self.width() // self.image_count
+            painter.drawLine(current_column, overview_top - 2, current_column, self.height())
+        painter.end()
+
+
+    def wheelEvent(self, event) -> None:
+        self.scroll_to(self.first_image - 3 * int(np.sign(event.angleDelta().y())))
+
+
+    def mousePressEvent(self, event) -> None:
+        position = event.position()
+        if position.y() >= self.height() - 8 and self.image_count > 0:
+            # Click on the overview bar jumps to that part of the project
+            image_number = int(position.x() * self.image_count / max(1, self.width()))
+        else:
+            image_number = self.first_image + int(position.x()) // (self.thumbnail_width + self.SPACING)
+        if 0 <= image_number < self.image_count and 'frame_selected' in self.attributes:
+            self.attributes['frame_selected'](min(image_number, self.image_count - 1))
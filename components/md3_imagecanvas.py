@@ -0,0 +1,358 @@
+"""
+PySide6 Image canvas component adapted to follow Material Design 3 guidelines
+
+"""
+import math
+
+import cv2
+import numpy as np
+from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QGraphicsRectItem, QFrame
+from PySide6.QtGui import QImage, QPixmap, QPainter, QTransform, QPen, QColor
+from PySide6.QtCore import Qt, QRectF
+
+from tools.box_array import to_box_array, to_pixels
+
+# ------------
+# Image Canvas
+# ------------
+class MD3ImageCanvas(QGraphicsView):
+    # Size in pixels of the tiles of every pyramid level
+    TILE_SIZE = 512
+    # Tiles kept in memory, hidden tiles are discarded beyond this count
+    MAX_TILES = 64
+    # Zoom range in percent of the image fitted to the canvas
+    ZOOM_RANGE = (100, 3200)
+    ZOOM_STEP = 1.25
+
+    def __init__(self, parent, attributes: dict) -> None:
+        """ Material Design 3 Component: Image Canvas
+
+        Zoomable and pannable image canvas. At 100 % zoom the image fits
+        the canvas and the displayed pixmap is drawn as it is. When
+        zooming in, the full size image is requested and only the visible
+        tiles of the level of a resolution pyramid (full size, 1/2,
+        1/4...) closest to the zoom are converted to pixmaps.
+
+        Annotations are kept as one graphics item per box over the
+        frame, drawn with a precomputed pen per class, so adding, moving
+        or removing a box only repaints the region of that box.
+
+        Mouse events are passed to the parent widgets, except when the
+        drag mode is enabled to pan the image.
+
+        Parameters
+        ----------
+        attributes: dict
+            position: tuple
+                Canvas position
+                (x, y) -> x, y: upper left corner
+            size: tuple
+                Canvas size
+                (w, h) -> w: width, h: height
+            full_image: def
+                Method returning the full size image (np.ndarray) of
+                the displayed frame, called when zooming in
+            zoom_changed: def
+                Canvas 'zoom changed' method name, receives the zoom in
+                percent
+            box_hit: def
+                Method receiving a canvas position (x, y), True if a box
+                is there. In drag mode, presses on boxes are passed to
+                the parent to edit the box instead of panning
+
+        Returns
+        -------
+        None
+        """
+        super(MD3ImageCanvas, self).__init__(parent)
+
+        self.attributes = attributes
+        self.parent = parent
+
+        x, y = attributes['position'] if 'position' in attributes else (8,8)
+        w, h = attributes['size'] if 'size' in attributes else (96, 96)
+        self.setGeometry(x, y, w, h)
+
+        self.canvas_scene = QGraphicsScene(self)
+        self.setScene(self.canvas_scene)
+        self.setFrameShape(QFrame.Shape.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+        self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        self.setBackgroundBrush(Qt.GlobalColor.black)
+
+        # Displayed pixmap, scaled to the full size of the frame
+        self.frame_item = QGraphicsPixmapItem()
+        self.frame_item.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
+        self.canvas_scene.addItem(self.frame_item)
+        # Annotation items over the frame, in the order of the boxes
+        self.box_items = []
+        self.class_pens = []
+
+        self.frame_size = (w, h)
+        self.zoom = 100
+        self.pyramid = []
+        # (level, column, row): tile pixmap item
+        self.tiles = {}
+        self.drag_enabled = False
+        # Mouse events of a press passed to the parent in drag mode
+        self.passing_events = False
+
+
+    # -----
+    # Frame
+    # -----
+    def set_frame_size(self, width: int, height: int) -> None:
+        """ Full size of the frames, the scene is in full size pixels """
+        self.frame_size = (width, height)
+        self.canvas_scene.setSceneRect(QRectF(0, 0, width, height))
+        self.clear_boxes()
+        self.clear_tiles()
+        self.set_zoom(100)
+
+
+    def setPixmap(self, pixmap: QPixmap) -> None:
+        """ Display a new frame
+
+        The pixmap can be smaller than the frame size (display size), it
+        is scaled to the frame size.
+        """
+        self.frame_item.setPixmap(pixmap)
+        self.frame_item.setScale(self.frame_size[0] / max(1, pixmap.width()))
+        self.clear_tiles()
+        self.update_tiles()
+
+
+    def set_preview(self, pixmap: QPixmap) -> None:
+        """ Display a low resolution preview, without requesting full size tiles """
+        self.frame_item.setPixmap(pixmap)
+        self.frame_item.setScale(self.frame_size[0] / max(1, pixmap.width()))
+        self.clear_boxes()
+        self.clear_tiles()
+
+
+    def normalized_distance(self, pixels: float) -> float:
+        """ Canvas distance in pixels to a normalized horizontal distance """
+        return pixels / (self.transform().m11() * self.frame_size[0])
+
+
+    def normalized_position(self, x: float, y: float) -> tuple:
+        """ Canvas position to normalized image coordinates (0 to 1) """
+        scene_point = self.mapToScene(int(x), int(y))
+        return (min(max(scene_point.x() / self.frame_size[0], 0.0), 1.0),
+                min(max(scene_point.y() / self.frame_size[1], 0.0), 1.0))
+
+
+    # -----
+    # Boxes
+    # -----
+    def set_class_colors(self, class_colors: list) -> None:
+        """ Pens of the classes, colors in hexadecimal format '#RRGGBB' """
+        self.class_pens = []
+        for class_color in class_colors:
+            pen = QPen(QColor.fromString(class_color))
+            # Cosmetic pens keep their width at any zoom
+            pen.setCosmetic(True)
+            pen.setWidth(2)
+            self.class_pens.append(pen)
+
+
+    def box_rect(self, box: list) -> QRectF:
+        """ Scene rectangle of a normalized box [class_index, x_center, y_center, width, height] """
+        _, x_center, y_center, width, height = box
+        return QRectF((x_center - width / 2) * self.frame_size[0], (y_center - height / 2) * self.frame_size[1],
+                      width * self.frame_size[0], height * self.frame_size[1])
+
+
+    def class_pen(self, class_index: int) -> QPen:
+        return self.class_pens[class_index] if class_index < len(self.class_pens) else QPen(Qt.GlobalColor.white)
+
+
+    def add_box(self, box: list, box_index: int = None) -> None:
+        """ Add the item of a box at a position, after the last box by default """
+        self.add_box_item(self.box_rect(box), int(box[0]), box_index)
+
+
+    def add_box_item(self, rect: QRectF, class_index: int, box_index: int = None) -> None:
+        item = QGraphicsRectItem(rect)
+        item.setPen(self.class_pen(class_index))
+        item.setZValue(2)
+        self.canvas_scene.addItem(item)
+        self.box_items.insert(len(self.box_items) if box_index is None else box_index, item)
+
+
+    def update_box(self, box_index: int, box: list) -> None:
+        """ Move, resize or reclassify the item of a box """
+        item = self.box_items[box_index]
+        item.setRect(self.box_rect(box))
+        item.setPen(self.class_pen(int(box[0])))
+
+
+    def remove_box(self, box_index: int) -> None:
+        self.canvas_scene.removeItem(self.box_items.pop(box_index))
+
+
+    def set_boxes(self, boxes) -> None:
+        """ Replace the items with the boxes of a frame (box array or list of boxes) """
+        self.clear_boxes()
+        boxes = to_box_array(boxes)
+        if len(boxes) == 0:
+            return
+        # Every box is converted to pixels at once
+        pixels = to_pixels(boxes, *self.frame_size).tolist()
+        for (left, top, width, height), class_index in zip(pixels, boxes['class_index'].tolist()):
+            self.add_box_item(QRectF(left, top, width, height), class_index)
+
+
+    def clear_boxes(self) -> None:
+        for item in self.box_items:
+            self.canvas_scene.removeItem(item)
+        self.box_items = []
+
+
+    # ----
+    # Zoom
+    # ----
+    def fit_scale(self) -> float:
+        return min(self.viewport().width() / self.frame_size[0], self.viewport().height() / self.frame_size[1])
+
+
+    def set_zoom(self, zoom: int) -> None:
+        """ Zoom in percent of the image fitted to the canvas """
+        self.zoom = int(min(max(zoom, self.ZOOM_RANGE[0]), self.ZOOM_RANGE[1]))
+        scale = self.fit_scale() * self.zoom / 100
+        self.setTransform(QTransform.fromScale(scale, scale))
+        if self.zoom == 100:
+            self.centerOn(self.frame_size[0] / 2, self.frame_size[1] / 2)
+        self.update_tiles()
+
+        if 'zoom_changed' in self.attributes:
+            self.attributes['zoom_changed'](self.zoom)
+
+
+    def zoom_in(self) -> None:
+        self.set_zoom(math.ceil(self.zoom * self.ZOOM_STEP))
+
+
+    def zoom_out(self) -> None:
+        self.set_zoom(math.floor(self.zoom / self.ZOOM_STEP))
+
+
+    # -----
+    # Tiles
+    # -----
+    def pyramid_level(self, level: int) -> np.ndarray:
+        """ Image of a pyramid level, built on demand from the full size image """
+        if not self.pyramid:
+            full_image = self.attributes['full_image']() if 'full_image' in self.attributes else None
+            if full_image is None:
+                return None
+            self.pyramid = [full_image]
+        while len(self.pyramid) <= level:
+            previous_level = self.pyramid[-1]
+            size = (max(1, previous_level.shape[1] // 2), max(1, previous_level.shape[0] // 2))
+            self.pyramid.append(cv2.resize(previous_level, size, interpolation=cv2.INTER_AREA))
+        return self.pyramid[level]
+
+
+    def update_tiles(self) -> None:
+        """ Show the visible tiles of the pyramid level of the current zoom """
+        if self.zoom <= 100:
+            for item in self.tiles.values():
+                item.setVisible(False)
+            return
+
+        scale = self.transform().m11()
+        level = max(0, int(math.floor(math.log2(1 / scale)))) if scale < 1 else 0
+        level_image = self.pyramid_level(level)
+        if level_image is None:
+            return
+
+        level_scale = 2 ** level
+        tile_scene_size = self.TILE_SIZE * level_scale
+        visible_rect = self.mapToScene(self.viewport().rect()).boundingRect().intersected(self.sceneRect())
+        first_column, last_column = int(visible_rect.left() // tile_scene_size), int(visible_rect.right() // tile_scene_size)
+        first_row, last_row = int(visible_rect.top() // tile_scene_size), int(visible_rect.bottom() // tile_scene_size)
+
+        visible_tiles = set()
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                key = (level, column, row)
+                if key not in self.tiles and not self.create_tile(key, level_image):
+                    continue
+                visible_tiles.add(key)
+
+        for key, item in list(self.tiles.items()):
+            item.setVisible(key in visible_tiles)
+            if key not in visible_tiles and len(self.tiles) > self.MAX_TILES:
+                self.canvas_scene.removeItem(item)
+                del self.tiles[key]
+
+
+    def create_tile(self, key: tuple, level_image: np.ndarray) -> bool:
+        level, column, row = key
+        top, left = row * self.TILE_SIZE, column * self.TILE_SIZE
+        tile = level_image[top:top + self.TILE_SIZE, left:left + self.TILE_SIZE]
+        if tile.size == 0:
+            return False
+
+        # QPixmap.fromImage copies the pixels, the array is only needed here
+        tile_array = cv2.cvtColor(tile, cv2.COLOR_BGR2BGRA)
+        tile_height, tile_width = tile_array.shape[:2]
+        tile_image = QImage(tile_array.data, tile_width, tile_height, tile_array.strides[0], QImage.Format.Format_RGB32)
+        item = QGraphicsPixmapItem(QPixmap.fromImage(tile_image))
+        item.setTransformationMode(Qt.TransformationMode.FastTransformation if level == 0
+                                   else Qt.TransformationMode.SmoothTransformation)
+        item.setPos(left * 2 ** level, top * 2 ** level)
+        item.setScale(2 ** level)
+        item.setZValue(1)
+        self.canvas_scene.addItem(item)
+        self.tiles[key] = item
+        return True
+
+
+    def clear_tiles(self) -> None:
+        for item in self.tiles.values():
+            self.canvas_scene.removeItem(item)
+        self.tiles = {}
+        self.pyramid = []
+
+
+    # ------
+    # Events
+    # ------
+    def set_drag_mode(self, state: bool) -> None:
+        """ Pan the image with the mouse instead of passing events to the parent """
+        self.drag_enabled = state
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag if state else QGraphicsView.DragMode.NoDrag)
+
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self.set_zoom(self.zoom)
+
+
+    def scrollContentsBy(self, dx: int, dy: int) -> None:
+        super().scrollContentsBy(dx, dy)
+        self.update_tiles()
+
+
+    def wheelEvent(self, event) -> None:
+        self.zoom_in() if event.angleDelta().y() > 0 else self.zoom_out()
+
+
+    def mousePressEvent(self, event) -> None:
+        self.passing_events = not self.drag_enabled or ('box_hit' in self.attributes and
+            self.attributes['box_hit'](event.position().x(), event.position().y()))
+        event.ignore() if self.passing_events else super().mousePressEvent(event)
+
+
+    def mouseMoveEvent(self, event) -> None:
+        event.ignore() if self.passing_events or not self.drag_enabled else super().mouseMoveEvent(event)
+
+
+    def mouseReleaseEvent(self, event) -> None:
+        event.ignore() if self.passing_events or not self.drag_enabled else super().mouseReleaseEvent(event)
+        self.passing_events = False
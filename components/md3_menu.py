@@ -28,6 +28,9 @@ class MD3Menu(QComboBox):
             set: int
                 Selected option
                 -1: No option selected
+            max_items: int
+                Maximum number of items (Optional), menus without
+                options are limited to 10 items by default
             enabled: bool
                 Menu enabled / disabled
             language: int
@@ -60,7 +63,7 @@ class MD3Menu(QComboBox):
             self.max_items = 10
 
         self.setMaxVisibleItems(self.max_items)
-        self.setMaxCount(self.max_items)
+        self.setMaxCount(attributes['max_items'] if 'max_items' in attributes else self.max_items)
         self.setSizeAdjustPolicy(QComboBox.SizeAdjustPolicy.AdjustToMinimumContentsLengthWithIcon)
         self.setCurrentIndex(attributes['set'])
         self.setEnabled(attributes['enabled']) if 'enabled' in attributes else True
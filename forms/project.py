@@ -11,6 +11,12 @@ Video File:
     Select the video file to annotate
 Results Folder:
     Folder path where annotations are saved
+Image Format:
+    Format of the extracted images (PNG, JPEG, WebP, lossless WebP)
+    and its compression level or quality
+Extract Frames:
+    Extract frames when creating the project or read them on demand
+    from the video
 Classes:
     Name of the class
     Color of the label for specified class
@@ -55,6 +61,7 @@ class NewProject(QDialog):
         self.color_value = ''
 
         self.class_count = 0
+        self.extract_frames_state = True
 
         self.form_fill_state = {
             'project_name_textfield': False,
@@ -128,6 +135,26 @@ class NewProject(QDialog):
             self.info_app.exec()
 
 
+    def on_image_format_changed(self, index: int) -> None:
+        """ Update quality field label for the selected image format """
+        quality_labels = {
+            0: ('Compresión PNG (0 - 9)', 'PNG Compression (0 - 9)'),
+            1: ('Calidad JPEG (0 - 100)', 'JPEG Quality (0 - 100)'),
+            2: ('Calidad WebP (0 - 100)', 'WebP Quality (0 - 100)'),
+            3: ('Calidad WebP (0 - 100)', 'WebP Quality (0 - 100)')
+        }
+        quality_textfield = self.ui.project_widgets['image_quality_textfield']
+        quality_textfield.attributes['labels'] = quality_labels[index]
+        quality_textfield.set_language(self.language_value)
+        quality_textfield.setEnabled(index != 3)
+
+
+    def on_extract_frames_switch_clicked(self) -> None:
+        """ Extract frames to disk or read them on demand from the video """
+        self.extract_frames_state = not self.extract_frames_state
+        self.ui.project_widgets['extract_frames_switch'].set_state(self.extract_frames_state, self.theme_color)
+
+
     def on_class_color_button_clicked(self) -> None:
         """ Color dialog button """
         self.color_value = QColorDialog.getColor().name()
@@ -169,12 +196,17 @@ class NewProject(QDialog):
 
     def on_ok_button_clicked(self) -> None:
         """ Checking and saving form values """
+        image_formats = ['png', 'jpeg', 'webp', 'webp_lossless']
+        image_quality = self.ui.project_widgets['image_quality_textfield'].text_field.text()
         self.project_data = {
             'project_name': self.ui.project_widgets['project_name_textfield'].text_field.text(),
             'video_file': self.ui.project_widgets['video_name_textfield'].text_field.text(),
             'project_folder': self.ui.project_widgets['project_folder_textfield'].text_field.text(),
             'frame_extraction': int(self.ui.project_widgets['frame_extraction_textfield'].text_field.text()),
-            'classes': self.classes_values
+            'classes': self.classes_values,
+            'image_format': image_formats[self.ui.project_widgets['image_format_menu'].currentIndex()],
+            'image_quality': int(image_quality) if image_quality != '' else None,
+            'extract_frames': self.extract_frames_state
         }
         self.close()
 
@@ -5,6 +5,8 @@ from PySide6.QtCore import Qt
 from components.md3_button import MD3Button
 from components.md3_card import MD3Card
 from components.md3_label import MD3Label
+from components.md3_menu import MD3Menu
+from components.md3_switch import MD3Switch
 from components.md3_textfield import MD3TextField
 from components.md3_table import MD3Table
 from components.md3_window import MD3Window
@@ -36,7 +38,7 @@ class ProjectUI(QDialog):
         # -----------
         # Main Window
         # -----------
-        (width, height) = (380, 452)
+        (width, height) = (380, 552)
         self.project_widgets['main_window'] = MD3Window( {
             'parent': parent,
             'size': (width, height),
@@ -99,36 +101,67 @@ class ProjectUI(QDialog):
             'input': 'integer',
             'labels': ('Extraer Cada Número de Cuadros', 'Extract Every Number of Frames'),
             'language': self.language_value } )
+
+        self.project_widgets['image_format_menu'] = MD3Menu(self.project_widgets['project_card'], {
+            'position': (8, 302),
+            'width': 164,
+            'type': 'outlined',
+            'options': {0: ('PNG', 'PNG'), 1: ('JPEG', 'JPEG'), 2: ('WebP', 'WebP'), 3: ('WebP sin pérdida', 'WebP lossless')},
+            'set': 0,
+            'language': self.language_value,
+            'index_changed': parent.on_image_format_changed } )
+
+        self.project_widgets['image_quality_textfield'] = MD3TextField(self.project_widgets['project_card'], {
+            'position': (180, 288),
+            'width': width - 204,
+            'type': 'outlined',
+            'input': 'integer',
+            'labels': ('Compresión PNG (0 - 9)', 'PNG Compression (0 - 9)'),
+            'language': self.language_value } )
+
+        self.project_widgets['extract_frames_label'] = MD3Label(self.project_widgets['project_card'], {
+            'position': (8, 356),
+            'width': width - 100,
+            'type': 'subtitle',
+            'align': 'left',
+            'labels': ('Extraer cuadros al crear el proyecto', 'Extract frames when creating the project'),
+            'language': self.language_value } )
+
+        self.project_widgets['extract_frames_switch'] = MD3Switch(self.project_widgets['project_card'], {
+            'position': (width - 84, 348),
+            'state': True,
+            'theme_color': self.theme_color,
+            'clicked': parent.on_extract_frames_switch_clicked } )
         
         self.project_widgets['class_textfield'] = MD3TextField(self.project_widgets['project_card'], {
-            'position': (8, 288),
+            'position': (8, 388),
             'width': width - 152,
             'type': 'outlined',
             'labels': ('Nombre de la Clase', 'Class Name'),
             'language': self.language_value } )
         
         self.project_widgets['class_color_button'] = MD3Button(self.project_widgets['project_card'], {
-            'position': (width - 136, 304),
+            'position': (width - 136, 404),
             'type': 'filled',
             'icon': 'palette',
             'theme_color': self.theme_color,
             'clicked': parent.on_class_color_button_clicked } )
         
         self.project_widgets['class_color_label'] = MD3Label(self.project_widgets['project_card'], {
-            'position': (width - 96, 304),
+            'position': (width - 96, 404),
             'type': 'color',
             'color': '#ff8888',
             'theme_color': self.theme_color } )
         
         self.project_widgets['class_add_button'] = MD3Button(self.project_widgets['project_card'], {
-            'position': (width - 56, 304),
+            'position': (width - 56, 404),
             'type': 'filled',
             'icon': 'new',
             'theme_color': self.theme_color,
             'clicked': parent.on_class_add_button_clicked } )
         
         self.project_widgets['new_class_table'] = MD3Table(self.project_widgets['project_card'], {
-            'position': (8, 348),
+            'position': (8, 448),
             'columns': 2,
             'column_widths': [100, 50],
             'rows': 1,
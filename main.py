@@ -5,7 +5,7 @@ This file contains main UI class and methods to control components operations.
 """
 
 from PySide6 import QtGui, QtWidgets
-from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QRubberBand
+from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QRubberBand, QProgressDialog
 from PySide6.QtCore import QTimer, QRect, QSize, QPoint, Qt
 from PySide6.QtGui import QPixmap, QColor
 
@@ -25,11 +25,30 @@ from forms.project import NewProject
 import backend
 
 from tools.annotators import box_annotations
+from tools.frame_cache import FrameCache
+from tools.qt_image import ImageConverter
+from tools.playback_clock import PlaybackClock, PLAYBACK_SPEEDS
+from tools.frame_source import FolderFrameSource, VideoFrameSource, build_frame_index
+from tools.video_index import frame_timestamp, timestamp_frame
+from tools.image_resize import create_output_folders
+from tools.extraction_manifest import ExtractionManifest
+from tools.annotation_journal import AnnotationJournal, inverse_command
+from tools.annotation_store import AnnotationStore
+from tools.box_array import to_box_array
+from tools.project_database import ProjectDatabase
+from tools.project_manifest import ProjectCatalog, build_manifest, save_manifest
+from tools.proxy_store import ProxyStore
+from tools.box_index import BoxIndex, edit_box
+from tools.pointer_coalescer import PointerCoalescer
 
 # For debugging
 from icecream import ic
 
 
+# Distance in pixels to grab a box handle
+HANDLE_TOLERANCE = 6
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         """ UI main application """
@@ -46,13 +65,14 @@ class MainWindow(QMainWindow):
         self.theme_color = self.config['THEME_COLOR']
         self.source_folder = self.config['SOURCE_FOLDER']
         self.project_folder = self.config['PROJECT_FOLDER']
+        # Registro de latencia del puntero y de la reproducción
+        self.performance_log = self.config['PERFORMANCE_LOG']
 
         # ---------
         # Variables
         # ---------
 
         self.frames_folder = ''
-        self.labeled_folder = ''
         self.resized_folder = ''
 
         self.video_width = None
@@ -64,14 +84,33 @@ class MainWindow(QMainWindow):
         self.timer_play = None
         self.timer_reverse = None
 
-        self.time_step = 0
+        self.extraction_thread = None
+        self.extraction_progress = None
+        self.extraction_fps = 0.0
+        self.proxy_thread = None
+        self.proxy_store = None
+        self.output_size_thread = None
+        self.video_index_thread = None
+        self.video_index = None
+        self.project_scan_thread = None
+        self.export_thread = None
+
+        self.playback_clock = None
+        self.image_converter = ImageConverter()
         self.frame_number = 0
         self.image_number = 0
         self.total_images = 0
         self.current_image = None
 
-        self.projects_list = None
+        self.projects_list = []
+        self.project_catalog = ProjectCatalog()
         self.project_info = None
+        self.project_path = None
+        # Imagen restaurada al abrir un proyecto
+        self.restore_image = 0
+        self.project_database = None
+        self.frame_source = None
+        self.image_settings = None
         self.active_class = ''
         self.active_class_index = None
         self.active_color = ''
@@ -81,7 +120,14 @@ class MainWindow(QMainWindow):
         self.left_label = None
         self.start_point = None
         self.end_point = None
-        self.current_boxes = []
+        self.current_boxes = to_box_array()
+        self.annotation_store = None
+        self.annotation_journal = None
+        self.box_index = BoxIndex()
+        # Box edited in drag mode: (box index, handle, start position, original box)
+        self.edited_box = None
+        # Box selected in drag mode, removed with Delete or reclassified with the classes menu
+        self.selected_box = None
 
         self.mouse_selection_state = False
         self.box_button_state = False
@@ -92,6 +138,9 @@ class MainWindow(QMainWindow):
         # GUI
         # ---
         self.ui = UI(self)
+        # Movimientos del mouse agrupados a la frecuencia de la pantalla
+        self.pointer_coalescer = PointerCoalescer(self.on_pointer_moved, self)
+        self.pointer_coalescer.watch(self.ui.gui_widgets['video_label'].viewport())
         theme = 'light' if self.theme_style else 'dark'
         theme_qss_file = f"themes/{self.theme_color}_{theme}_theme.qss"
         with open(theme_qss_file, "r") as theme_qss:
@@ -100,10 +149,9 @@ class MainWindow(QMainWindow):
         # -------------
         # Load Projects
         # -------------
-        self.projects_list = list(Path(self.project_folder).iterdir())
-        for project_name in self.projects_list:
-            self.ui.gui_widgets['projects_menu'].addItem(project_name.name)
-        self.ui.gui_widgets['projects_menu'].setCurrentIndex(-1)
+        # Proyectos del catálogo local, actualizado en segundo plano
+        self.update_projects_menu()
+        self.start_project_scan()
 
     # -----------------
     # Options Functions
@@ -165,9 +213,11 @@ class MainWindow(QMainWindow):
         self.ui.gui_widgets['about_button'].move(128, height - 40)
 
         self.ui.gui_widgets['video_toolbar_card'].resize(width - 204, 68)
-        self.ui.gui_widgets['video_slider'].resize(self.ui.gui_widgets['video_toolbar_card'].width() - 324, 32)
+        self.ui.gui_widgets['video_slider'].resize(self.ui.gui_widgets['video_toolbar_card'].width() - 408, 32)
+        self.ui.gui_widgets['speed_menu'].move(self.ui.gui_widgets['video_toolbar_card'].width() - 192, 20)
         self.ui.gui_widgets['frame_value_textfield'].move(self.ui.gui_widgets['video_toolbar_card'].width() - 108, 8)
-        self.ui.gui_widgets['video_output_card'].resize(width - 392, height - 92)
+        self.ui.gui_widgets['filmstrip'].resize(width - 392, 72)
+        self.ui.gui_widgets['video_output_card'].resize(width - 392, height - 172)
         self.ui.gui_widgets['autolabelling_card'].move(width - 188, 84)
 
         frame_width = (self.ui.gui_widgets['video_output_card'].height() - 56) * self.aspect_ratio
@@ -176,6 +226,9 @@ class MainWindow(QMainWindow):
             frame_width = self.ui.gui_widgets['video_output_card'].width() - 16
             frame_height = frame_width / self.aspect_ratio
         self.ui.gui_widgets['video_label'].resize(frame_width, frame_height)
+        if self.current_image is not None:
+            self.update_display_size()
+            self.draw_frame()
                 
         return super().resizeEvent(a0)
 
@@ -183,7 +236,74 @@ class MainWindow(QMainWindow):
     # Funciones Proyecto
     # ------------------
     def on_projects_changed(self) -> None:
-        print(self.ui.gui_widgets['projects_menu'].currentIndex())
+        """ Open the selected project from its database, without scanning its folders """
+        index = self.ui.gui_widgets['projects_menu'].currentIndex()
+        if not 0 <= index < len(self.projects_list):
+            return
+        project_path = Path(self.project_folder) / self.projects_list[index]
+        if project_path == self.project_path:
+            return
+        # Proyecto del catálogo borrado o movido desde el último escaneo
+        if not project_path.is_dir() or not ProjectDatabase.exists(project_path):
+            self.project_catalog.remove(self.project_folder, self.projects_list[index])
+            self.update_projects_menu()
+            self.info_app = InfoMessageApp({'size': (300, 100), 'type': 'warning',
+                'messages': (f"El proyecto {project_path.name} ya no existe",
+                             f"Project {project_path.name} no longer exists") })
+            self.info_app.exec()
+            return
+        if self.timer_play is not None:
+            self.on_pause_button_clicked()
+        manifest = self.project_catalog.manifest(self.project_folder, self.projects_list[index]) or {}
+        self.project_info = backend.load_project_data(project_path)
+        self.load_project(project_path, manifest.get('last_image', 0))
+
+
+    def update_projects_menu(self) -> None:
+        """ Fill the projects menu with the cached projects of the projects folder """
+        self.projects_list = self.project_catalog.projects(self.project_folder)
+        projects_menu = self.ui.gui_widgets['projects_menu']
+        projects_menu.blockSignals(True)
+        projects_menu.clear()
+        projects_menu.addItems(self.projects_list)
+        if (self.project_path is not None and self.project_path.parent == Path(self.project_folder) and
+            self.project_path.name in self.projects_list):
+            projects_menu.setCurrentIndex(self.projects_list.index(self.project_path.name))
+        else:
+            projects_menu.setCurrentIndex(-1)
+        projects_menu.blockSignals(False)
+
+
+    def start_project_scan(self) -> None:
+        """ Refresh the cached manifests of the projects folder in the background """
+        if not Path(self.project_folder).is_dir():
+            return
+        self.stop_project_scan()
+        self.project_scan_thread = backend.ProjectScan(self.project_folder,
+                                                       self.project_catalog.cached_projects(self.project_folder))
+        self.project_scan_thread.projects_scanned.connect(self.on_projects_scanned)
+        self.project_scan_thread.start()
+
+
+    def stop_project_scan(self) -> None:
+        if self.project_scan_thread and self.project_scan_thread.isRunning():
+            self.project_scan_thread.wait()
+
+
+    def on_projects_scanned(self, project_folder: str, projects: dict) -> None:
+        self.project_catalog.set_projects(project_folder, projects)
+        if Path(project_folder) == Path(self.project_folder):
+            self.update_projects_menu()
+
+
+    def save_project_manifest(self) -> None:
+        """ Save the manifest of the open project and cache it in the catalog """
+        if self.project_database is None or self.annotation_store is None:
+            return
+        manifest = build_manifest(self.project_database.load_metadata(), self.total_images, self.image_number,
+                                  self.annotation_store)
+        save_manifest(self.project_path, manifest)
+        self.project_catalog.update(self.project_path, manifest)
 
 
     def on_project_folder_button_clicked(self) -> None:
@@ -201,10 +321,8 @@ class MainWindow(QMainWindow):
                 yaml.dump(self.config, file)
 
             # Menu
-            self.projects_list = list(Path(self.project_folder).iterdir())
-            for project_name in self.projects_list:
-                self.ui.gui_widgets['projects_menu'].addItem(project_name.name)
-            self.ui.gui_widgets['projects_menu'].setCurrentIndex(-1)
+            self.update_projects_menu()
+            self.start_project_scan()
         else:
             self.info_app = InfoMessageApp({'size': (300, 100), 'type': 'error',
                 'messages': ("No se seleccionó la carpeta de ubicación de los proyecto",
@@ -212,6 +330,38 @@ class MainWindow(QMainWindow):
             self.info_app.exec()
     
 
+    def on_project_export_button_clicked(self) -> None:
+        """ Export the annotations as YOLO label files and a CSV file """
+        if self.annotation_store is None:
+            return
+        folder_dialog = { 0: 'Seleccione la carpeta de exportación',
+                          1: 'Select export folder' }
+        selected_folder = QFileDialog.getExistingDirectory(parent = self,
+            caption = folder_dialog[self.language_value],
+            dir = str(self.project_path) )
+        if not selected_folder:
+            return
+
+        self.stop_annotation_export()
+        self.export_thread = backend.AnnotationExport(self.annotation_store, selected_folder,
+            self.project_info['project_name'], self.total_images, list(self.project_info['classes']))
+        self.export_thread.export_finished.connect(self.on_annotation_export_finished)
+        self.export_thread.start()
+
+
+    def stop_annotation_export(self) -> None:
+        """ Wait for a running export, it reads the open annotations """
+        if self.export_thread and self.export_thread.isRunning():
+            self.export_thread.wait()
+
+
+    def on_annotation_export_finished(self, export_folder: str) -> None:
+        self.info_app = InfoMessageApp({'size': (300, 100), 'type': 'success',
+            'messages': (f"Anotaciones exportadas en {export_folder}",
+                         f"Annotations exported to {export_folder}") })
+        self.info_app.exec()
+
+
     def on_project_new_button_clicked(self) -> None:
         """ Configure new project """
         self.new_window = NewProject()
@@ -222,95 +372,449 @@ class MainWindow(QMainWindow):
         if self.project_info:
             # Información del proyecto
             project_name = self.project_info['project_name']
-            video_file = self.project_info['video_file']
             project_folder = self.project_info['project_folder']
-            classes = self.project_info['classes']
-            frame_extraction = self.project_info['frame_extraction']
+            self.project_info['output_sizes'] = self.config['OUTPUT_SIZES']
 
             # Creación de la carpeta del proyecto
             main_project_folder = Path(f'{project_folder}/{project_name}')
             if not main_project_folder.exists():
                 main_project_folder.mkdir()
+                backend.save_project_data(main_project_folder, self.project_info)
+                self.load_project(main_project_folder)
+            elif ExtractionManifest.is_unfinished(main_project_folder):
+                # Reanudación de la extracción interrumpida
+                self.project_info = backend.load_project_data(main_project_folder)
+                self.info_app = InfoMessageApp({'size': (300, 100), 'type': 'warning',
+                    'messages': ("Se reanuda la extracción de frames del proyecto",
+                                "Resuming frame extraction of the project") })
+                self.info_app.exec()
+                self.load_project(main_project_folder)
+            else:
+                self.info_app = InfoMessageApp({'size': (300, 100), 'type': 'warning',
+                    'messages': ("La carpeta ya existe",
+                                "Folder already exists") })
+                self.info_app.exec()
 
-                # Creación de sub-carpetas
-                self.frames_folder = Path(f'{project_folder}/{project_name}/frames')
-                self.frames_folder.mkdir()
 
-                self.labeled_folder = Path(f'{project_folder}/{project_name}/labels')
-                self.labeled_folder.mkdir()
+    def load_project(self, project_path: Path, restore_image: int = 0) -> None:
+        """ Load project information and start frame extraction or video reading
 
-                self.resized_folder = Path(f'{project_folder}/{project_name}/resized')
-                self.resized_folder.mkdir()
+        Parameters
+        ----------
+        project_path: Path
+            Project folder
+        restore_image: int
+            Image shown first, the last image of the previous session
+        """
+        # Cierre del proyecto anterior
+        self.stop_frame_extraction()
+        self.stop_output_size_generation()
+        self.stop_video_indexing()
+        self.stop_proxy_generation()
+        self.close_project_database()
+        self.project_path = project_path
+        self.restore_image = restore_image
+        video_file = self.project_info['video_file']
+        classes = self.project_info['classes']
+        frame_extraction = self.project_info['frame_extraction']
+        extract_frames = self.project_info['extract_frames']
+        # Tamaños de salida añadidos en la configuración después de crear el proyecto
+        new_output_sizes = [output_size for output_size in self.config['OUTPUT_SIZES']
+                            if output_size not in self.project_info['output_sizes']] if extract_frames else []
+        self.project_info['output_sizes'] = self.project_info['output_sizes'] + new_output_sizes
+        self.project_info['pending_output_sizes'] = self.project_info.get('pending_output_sizes', []) + new_output_sizes
+        self.image_settings = {
+            'image_format': self.project_info['image_format'],
+            'image_quality': self.project_info['image_quality'],
+            'output_sizes': self.project_info['output_sizes']
+        }
+
+        # Creación de sub-carpetas
+        self.frames_folder = project_path / 'frames'
+        self.frames_folder.mkdir(exist_ok=True)
+
+        # Base de datos del proyecto (metadatos, clases, frames y anotaciones)
+        self.project_database = ProjectDatabase(project_path)
+
+        self.annotation_store = AnnotationStore(self.project_database)
+        self.annotation_store.load()
+        # Recuperación de las ediciones no guardadas antes de un cierre inesperado
+        self.annotation_journal = AnnotationJournal(self.annotation_store, project_path)
+        replayed = self.annotation_journal.replay()
+        if replayed > 0:
+            print(f'Recovered {replayed} annotation edits')
+
+        self.resized_folder = project_path / 'resized'
+        self.resized_folder.mkdir(exist_ok=True)
+        create_output_folders(self.resized_folder, self.image_settings['output_sizes'])
+
+        # Información del video (cabecera del contenedor, el índice de paquetes se lee en segundo plano)
+        if 'video' not in self.project_info:
+            self.project_info['video'] = backend.probe_video(video_file)
+            self.project_database.save_metadata(self.project_info)
+        elif new_output_sizes:
+            self.project_database.save_metadata(self.project_info)
+        video_properties = self.project_info['video']
+        self.video_width = video_properties["width"]
+        self.video_height = video_properties["height"]
+        self.total_frames = video_properties['frame_count']
+        self.video_fps = video_properties['fps']
+        self.aspect_ratio = float(self.video_width / self.video_height)
+
+        # Presentación de Información
+        self.ui.gui_widgets['filename_value'].setText(f'{Path(video_file).name}')
+        self.ui.gui_widgets['size_value'].setText(f'{self.video_width} X {self.video_height}')
+        self.ui.gui_widgets['total_frames_value'].setText(f'{self.total_frames}')
+        self.ui.gui_widgets['fps_value'].setText(f"{self.video_fps:.2f}")
+
+        # Configuración de clases
+        self.ui.gui_widgets['video_label'].set_class_colors(list(classes.values()))
+        self.ui.gui_widgets['classes_menu'].clear()
+        for class_name in classes.keys():
+            self.ui.gui_widgets['classes_menu'].addItem(class_name)
+
+        # Configuración de barra de video
+        self.total_images = 0
+        self.image_number = 0
+        self.current_image = None
+        self.ui.gui_widgets['video_slider'].setMaximum(0)
+        self.ui.gui_widgets['video_slider'].setEnabled(False)
+        self.ui.gui_widgets['filmstrip'].set_image_count(0, self.aspect_ratio)
+        self.ui.gui_widgets['filmstrip'].set_thumbnails_ready(0)
+        self.ui.gui_widgets['frame_value_textfield'].text_field.setText('0')
+
+        # Timers
+        speed = PLAYBACK_SPEEDS[self.ui.gui_widgets['speed_menu'].currentIndex()]
+        self.playback_clock = PlaybackClock(self.video_fps, frame_extraction, speed)
+        self.timer_play = QTimer()
+        self.timer_play.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer_play.timeout.connect(self.playback_forward)
+        self.timer_reverse = QTimer()
+        self.timer_reverse.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer_reverse.timeout.connect(self.playback_backward)
+
+        # Tamaño de la imagen
+        frame_width = (self.ui.gui_widgets['video_output_card'].height() - 56) * self.aspect_ratio
+        frame_height = self.ui.gui_widgets['video_output_card'].height() - 56
+        if frame_width > self.ui.gui_widgets['video_output_card'].width() - 16:
+            frame_width = self.ui.gui_widgets['video_output_card'].width() - 16
+            frame_height = frame_width / self.aspect_ratio
+        self.ui.gui_widgets['video_label'].resize(frame_width, frame_height)
+        self.ui.gui_widgets['video_label'].set_frame_size(self.video_width, self.video_height)
+
+        # Registro de frames del proyecto
+        frame_numbers = build_frame_index(self.total_frames, frame_extraction)
+        if self.project_database.frame_count() != len(frame_numbers):
+            self.project_database.set_frames(frame_numbers)
+
+        # Miniaturas para la previsualización del slider, la extracción escribe las de los frames que decodifica
+        self.proxy_store = ProxyStore(self.project_path, len(frame_numbers))
+
+        if self.frame_source is not None:
+            self.frame_source.release()
+        if extract_frames and ExtractionManifest(project_path, video_file, frame_extraction).finished:
+            # Frames ya extraídos
+            self.frame_source = FrameCache(FolderFrameSource(self.frames_folder, self.image_settings,
+                (self.video_width, self.video_height)),
+                self.config['FRAME_CACHE_MB'] * 1024**2, self.config['FRAME_PREFETCH'])
+            self.update_display_size()
+            self.on_extraction_images_ready(len(frame_numbers))
+            self.start_output_size_generation()
+        elif extract_frames:
+            # Extracción de frames del video en segundo plano
+            self.frame_source = FrameCache(FolderFrameSource(self.frames_folder, self.image_settings,
+                (self.video_width, self.video_height)),
+                self.config['FRAME_CACHE_MB'] * 1024**2, self.config['FRAME_PREFETCH'])
+            self.update_display_size()
+            self.start_frame_extraction(video_file, frame_extraction)
+        else:
+            # Lectura de frames directamente del video
+            self.frame_source = FrameCache(VideoFrameSource(video_file, frame_numbers, None, self.image_settings),
+                self.config['FRAME_CACHE_MB'] * 1024**2, self.config['FRAME_PREFETCH'])
+            self.update_display_size()
+            self.on_extraction_images_ready(len(frame_numbers))
+
+        # Índice de paquetes del video (acceso aleatorio y número exacto de frames)
+        self.video_index = None
+        self.start_video_indexing(video_file)
+
+        # Miniaturas para la previsualización del slider
+        self.start_proxy_generation(video_file, frame_extraction)
+
+        # Manifiesto para el menú de proyectos
+        self.save_project_manifest()
+        self.update_projects_menu()
+
+
+    def start_frame_extraction(self, video_file: str, frame_extraction: int) -> None:
+        """ Start background frame extraction with a non-blocking progress dialog """
+        self.stop_frame_extraction()
+
+        progress_texts = { 0: ('Extrayendo frames...', 'Cancelar'),
+                           1: ('Extracting frames...', 'Cancel') }
+        self.extraction_progress = QProgressDialog(
+            labelText = progress_texts[self.language_value][0],
+            cancelButtonText = progress_texts[self.language_value][1],
+            minimum = 0,
+            maximum = self.total_frames,
+            parent = self
+        )
+        self.extraction_progress.setWindowModality(Qt.WindowModality.NonModal)
+        self.extraction_progress.setMinimumDuration(0)
+        self.extraction_progress.setValue(0)
+
+        self.extraction_thread = backend.FrameExtraction(video_file, self.frames_folder, self.resized_folder,
+            frame_extraction, workers=self.config['EXTRACTION_WORKERS'], project_path=self.project_path,
+            image_settings=self.image_settings, frame_count=self.total_frames, proxy_store=self.proxy_store)
+        self.extraction_thread.progress.connect(self.on_extraction_progress)
+        self.extraction_thread.throughput.connect(self.on_extraction_throughput)
+        self.extraction_thread.eta.connect(self.on_extraction_eta)
+        self.extraction_thread.images_ready.connect(self.on_extraction_images_ready)
+        self.extraction_thread.proxies_ready.connect(self.ui.gui_widgets['filmstrip'].set_thumbnails_ready)
+        self.extraction_thread.extraction_finished.connect(self.on_extraction_finished)
+        self.extraction_thread.extraction_failed.connect(self.on_extraction_failed)
+        self.extraction_progress.canceled.connect(self.extraction_thread.requestInterruption)
+        self.extraction_thread.start()
+
+
+    def start_proxy_generation(self, video_file: str, frame_extraction: int) -> None:
+        """ Generate the slider preview thumbnails in the background
+
+        The video is only decoded again for projects without extracted
+        frames, the thumbnails of extracted projects come from the
+        extraction or from the extracted images.
+        """
+        self.stop_proxy_generation()
+        # La extracción en curso escribe las miniaturas, las que falten se leen al terminar
+        if self.extraction_thread and self.extraction_thread.isRunning():
+            return
+        total_images = -(-self.total_frames // max(1, frame_extraction))
+        if self.proxy_store is None or len(self.proxy_store) != total_images:
+            self.proxy_store = ProxyStore(self.project_path, total_images)
+        if self.project_info['extract_frames']:
+            frame_source = FolderFrameSource(self.frames_folder, self.image_settings, (self.video_width, self.video_height))
+            self.proxy_thread = backend.ProxyGeneration(video_file, self.proxy_store, frame_extraction,
+                frame_source=frame_source, image_count=self.total_images)
+        else:
+            self.proxy_thread = backend.ProxyGeneration(video_file, self.proxy_store, frame_extraction)
+        self.proxy_thread.proxies_ready.connect(self.ui.gui_widgets['filmstrip'].set_thumbnails_ready)
+        self.proxy_thread.start()
+
+
+    def start_video_indexing(self, video_file: str) -> None:
+        """ Load or build the packet index of the video in the background """
+        self.stop_video_indexing()
+        self.video_index_thread = backend.VideoIndexing(video_file, self.project_path)
+        self.video_index_thread.video_indexed.connect(self.on_video_indexed)
+        self.video_index_thread.start()
+
+
+    def stop_video_indexing(self) -> None:
+        if self.video_index_thread and self.video_index_thread.isRunning():
+            self.video_index_thread.requestInterruption()
+            self.video_index_thread.wait()
+        self.video_index_thread = None
+
+
+    def on_video_indexed(self, frame_index: dict) -> None:
+        """ Use the packet index for random access and correct the probed video properties """
+        # Señal pendiente de un proyecto ya cerrado
+        if self.sender() is not self.video_index_thread:
+            return
+        self.video_index = frame_index
+        video_source = isinstance(self.frame_source.frame_source, VideoFrameSource)
+        if video_source:
+            with self.frame_source.source_lock:
+                self.frame_source.frame_source.video_index = frame_index
+
+        # Propiedades exactas y tiempos de los frames, calculados una sola vez por proyecto
+        if 'keyframe_count' in self.project_info['video']:
+            return
+        self.project_info['video'] = backend.indexed_video_properties(self.project_info['video'], frame_index)
+        self.project_database.save_metadata({'video': self.project_info['video']})
+        self.video_fps = self.project_info['video']['fps']
+        self.ui.gui_widgets['fps_value'].setText(f"{self.video_fps:.2f}")
+        self.playback_clock.set_fps(self.video_fps)
+        self.update_timer_intervals()
+
+        frame_extraction = self.project_info['frame_extraction']
+        frame_count_changed = self.project_info['video']['frame_count'] != self.total_frames
+        self.total_frames = self.project_info['video']['frame_count']
+        frame_numbers = build_frame_index(self.total_frames, frame_extraction)
+        # Tiempo de presentación de cada imagen en el video original
+        timestamps = frame_timestamp(frame_index, frame_numbers) if len(frame_index['timestamp']) >= self.total_frames else None
+        self.project_database.set_frames(frame_numbers, timestamps)
+        if not frame_count_changed:
+            return
+
+        # Número de frames distinto del informado por el contenedor
+        self.ui.gui_widgets['total_frames_value'].setText(f'{self.total_frames}')
+        if video_source:
+            with self.frame_source.source_lock:
+                self.frame_source.frame_source.frame_numbers = frame_numbers
+            if len(frame_numbers) < self.total_images:
+                self.total_images = len(frame_numbers)
+                self.frame_source.image_count = self.total_images
+                self.ui.gui_widgets['video_slider'].setMaximum(self.total_images - 1)
+                self.ui.gui_widgets['filmstrip'].set_image_count(self.total_images)
+            self.on_extraction_images_ready(len(frame_numbers))
+        self.start_proxy_generation(self.project_info['video_file'], frame_extraction)
 
-                # Extracción de frames del video
-                self.total_images = backend.frame_extraction(video_file, self.frames_folder, self.labeled_folder, self.resized_folder, frame_extraction)
 
-                # Extracción de información del video
-                video_properties = backend.open_video(video_file)
-                self.video_width = video_properties["width"]
-                self.video_height = video_properties["height"]
-                self.total_frames = video_properties['frame_count']
-                self.video_fps = video_properties['fps']
-                self.aspect_ratio = float(self.video_width / self.video_height)
+    def start_output_size_generation(self) -> None:
+        """ Resize the extracted frames to the output sizes added to the project """
+        self.stop_output_size_generation()
+        if not self.project_info['pending_output_sizes']:
+            return
+        self.output_size_thread = backend.OutputSizeGeneration(self.frames_folder, self.resized_folder,
+            self.project_info['pending_output_sizes'], self.image_settings)
+        self.output_size_thread.generation_finished.connect(self.on_output_size_generation_finished)
+        self.output_size_thread.start()
 
-                # Presentación de Información
-                self.ui.gui_widgets['filename_value'].setText(f'{Path(video_file).name}')
-                self.ui.gui_widgets['size_value'].setText(f'{self.video_width} X {self.video_height}')
-                self.ui.gui_widgets['total_frames_value'].setText(f'{self.total_frames}')
-                self.ui.gui_widgets['fps_value'].setText(f"{self.video_fps}")
 
-                # Configuración de clases
-                self.ui.gui_widgets['classes_menu'].clear()
-                for class_name in classes.keys():
-                    self.ui.gui_widgets['classes_menu'].addItem(class_name)
+    def stop_output_size_generation(self) -> None:
+        if self.output_size_thread and self.output_size_thread.isRunning():
+            self.output_size_thread.requestInterruption()
+            self.output_size_thread.wait()
+        self.output_size_thread = None
 
-                # Configuración de barra de video
-                self.ui.gui_widgets['video_slider'].setMaximum(self.total_images - 1)
-                self.ui.gui_widgets['video_slider'].setEnabled(True)
-                self.ui.gui_widgets['frame_value_textfield'].text_field.setText('0')
-                self.ui.gui_widgets['zoom_value_textfield'].text_field.setText('100')
-
-                # Timers
-                self.timer_play = QTimer()
-                self.timer_play.timeout.connect(self.play_forward)
-                self.timer_reverse = QTimer()
-                self.timer_reverse.timeout.connect(self.play_backward)
-
-                # Presentación del frame 0
-                self.draw_frame()
-                frame_width = (self.ui.gui_widgets['video_output_card'].height() - 56) * self.aspect_ratio
-                frame_height = self.ui.gui_widgets['video_output_card'].height() - 56
-                if frame_width > self.ui.gui_widgets['video_output_card'].width() - 16:
-                    frame_width = self.ui.gui_widgets['video_output_card'].width() - 16
-                    frame_height = frame_width / self.aspect_ratio
-                self.ui.gui_widgets['video_label'].resize(frame_width, frame_height)
-            else:
-                self.info_app = InfoMessageApp({'size': (300, 100), 'type': 'warning',
-                    'messages': ("La carpeta ya existe",
-                                "Folder already exists") })
-                self.info_app.exec()
+
+    def on_output_size_generation_finished(self, image_count: int) -> None:
+        # Señal pendiente de un proyecto ya cerrado
+        if self.sender() is not self.output_size_thread:
+            return
+        print(f'Output sizes: {image_count} resized images written')
+        self.project_info['pending_output_sizes'] = []
+        self.project_database.save_metadata({'pending_output_sizes': []})
+
+
+    def stop_proxy_generation(self) -> None:
+        if self.proxy_thread and self.proxy_thread.isRunning():
+            self.proxy_thread.requestInterruption()
+            self.proxy_thread.wait()
+
+
+    def stop_frame_extraction(self) -> None:
+        """ Cancel running frame extraction and wait for the worker """
+        if self.extraction_thread and self.extraction_thread.isRunning():
+            self.extraction_thread.requestInterruption()
+            self.extraction_thread.wait()
+
+
+    def on_extraction_progress(self, frame_number: int, frame_count: int) -> None:
+        self.extraction_progress.setMaximum(frame_count)
+        self.extraction_progress.setValue(frame_number)
+
+
+    def on_extraction_throughput(self, frames_per_second: float) -> None:
+        self.extraction_fps = frames_per_second
+
+
+    def on_extraction_eta(self, eta: float) -> None:
+        progress_text = { 0: 'Extrayendo frames...', 1: 'Extracting frames...' }
+        minutes, seconds = divmod(int(eta), 60)
+        hours, minutes = divmod(minutes, 60)
+        self.extraction_progress.setLabelText(f'{progress_text[self.language_value]}\n'
+            f'{self.extraction_fps:.1f} fps - ETA {hours}:{minutes:02d}:{seconds:02d}')
+
+
+    def on_extraction_images_ready(self, images_ready: int) -> None:
+        """ Enable browsing of the images extracted so far """
+        if images_ready <= self.total_images:
+            return
+        self.total_images = images_ready
+        self.frame_source.image_count = images_ready
+        self.ui.gui_widgets['video_slider'].setMaximum(self.total_images - 1)
+        self.ui.gui_widgets['video_slider'].setEnabled(True)
+        self.ui.gui_widgets['filmstrip'].set_image_count(self.total_images)
+
+        # Presentación del último frame de la sesión anterior, o del frame 0
+        if self.current_image is None:
+            self.image_number = min(self.restore_image, self.total_images - 1)
+            self.ui.gui_widgets['video_slider'].setValue(self.image_number)
+            self.ui.gui_widgets['frame_value_textfield'].text_field.setText(f"{self.image_number}")
+            self.draw_frame()
+
+
+    def on_extraction_finished(self, total_images: int) -> None:
+        # Señal pendiente de un proyecto ya cerrado
+        if self.sender() is not self.extraction_thread:
+            return
+        self.on_extraction_images_ready(total_images)
+        self.extraction_progress.close()
+        # Miniaturas de las imágenes extraídas sin miniatura (extracción en paralelo o reanudada)
+        self.extraction_thread.wait()
+        self.start_proxy_generation(self.project_info['video_file'], self.project_info['frame_extraction'])
+        # Imágenes extraídas antes de añadir los nuevos tamaños de salida
+        if not self.extraction_thread.isInterruptionRequested():
+            self.start_output_size_generation()
+
+
+    def on_extraction_failed(self, error: str) -> None:
+        self.extraction_progress.close()
+        self.info_app = InfoMessageApp({'size': (300, 100), 'type': 'error',
+            'messages': (f"Error en la extracción de frames, se reanudará al abrir el proyecto: {error}",
+                         f"Frame extraction error, it resumes when the project is opened: {error}") })
+        self.info_app.exec()
+
+
+    def close_project_database(self) -> None:
+        """ Write the pending annotations and close the project database """
+        self.stop_annotation_export()
+        self.save_project_manifest()
+        if self.annotation_journal is not None:
+            self.annotation_journal.close()
+            self.annotation_journal = None
+        if self.annotation_store is not None:
+            self.annotation_store.close()
+            self.annotation_store = None
+        if self.project_database is not None:
+            self.project_database.close()
+            self.project_database = None
+
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        self.stop_frame_extraction()
+        self.stop_output_size_generation()
+        self.stop_video_indexing()
+        self.stop_proxy_generation()
+        self.stop_project_scan()
+        if self.frame_source is not None:
+            self.frame_source.release()
+        self.close_project_database()
+        return super().closeEvent(event)
 
     # --------------------
     # Funciones Etiquetado
     # --------------------
     def on_classes_changed(self, index):
+        # Menú vaciado al cambiar de proyecto
+        if index < 0:
+            return
         classes = self.project_info['classes']
         self.active_class = self.ui.gui_widgets['classes_menu'].currentText()
         self.active_class_index = index
         self.active_color = classes[self.active_class]
         self.ui.gui_widgets['class_color_label'].set_color_label(self.active_color)
 
+        # Cambio de clase del box seleccionado
+        if self.drag_button_state and self.selected_box is not None:
+            box = self.current_boxes[self.selected_box].tolist()
+            if box[0] != index:
+                self.apply_box_command(self.annotation_journal.execute('reclassify', self.image_number,
+                                                                       self.selected_box, box, [index, *box[1:]]))
+
 
     def on_drag_button_clicked(self):
         self.drag_button_state = not self.drag_button_state
         if self.drag_button_state:
             self.ui.gui_widgets['drag_button'].setStyleSheet('border-width: 3px; border-color: hsl(348, 100%, 61%)')
             self.ui.gui_widgets['video_label'].setCursor(Qt.CursorShape.OpenHandCursor)
-            self.mouse_selection_state = True
         else:
             self.ui.gui_widgets['drag_button'].setStyleSheet('border-width: 0px')
             self.ui.gui_widgets['video_label'].setCursor(Qt.CursorShape.ArrowCursor)
-            self.mouse_selection_state = False
+        # Desplazamiento de la imagen con el mouse
+        self.ui.gui_widgets['video_label'].set_drag_mode(self.drag_button_state)
         
 
     def on_polygon_button_clicked(self):
@@ -340,6 +844,9 @@ class MainWindow(QMainWindow):
     # Funciones Mouse
     # ---------------
     def mousePressEvent(self, event):
+        if self.drag_button_state:
+            self.start_box_edit(*self.canvas_position(event))
+            return
         if self.mouse_selection_state:
             self.top_label = self.ui.gui_widgets['video_output_card'].y() + 48
             self.left_label = self.ui.gui_widgets['video_output_card'].x() + 8
@@ -350,6 +857,7 @@ class MainWindow(QMainWindow):
                 (0 < self.start_point.y() < self.ui.gui_widgets['video_label'].height())):
                 if not self.rubberBand:
                     self.rubberBand = QRubberBand(QRubberBand.Shape.Rectangle, self.ui.gui_widgets['video_label'])
+                    self.pointer_coalescer.watch(self.rubberBand)
                 self.rubberBand.setGeometry(QRect(self.start_point, QSize()))
                 self.rubberBand.show()
 
@@ -357,8 +865,16 @@ class MainWindow(QMainWindow):
         # Se debe definir no el end point sino el next point
         # Si es un box, solo son 2 puntos
         # Si es un polygon, se debe definir cuál va a ser el end point
+        if self.edited_box or self.rubberBand:
+            self.pointer_coalescer.push(*self.canvas_position(event))
+
+    def on_pointer_moved(self, x: float, y: float):
+        """ Drawing state updated from the latest mouse position only """
+        if self.edited_box:
+            self.move_box_edit(x, y)
+            return
         if self.rubberBand:
-            self.end_point = QPoint(event.position().x() - self.left_label, event.position().y() - self.top_label)
+            self.end_point = QPoint(int(x), int(y))
             if self.end_point.x() < 0:
                 self.end_point.setX(0)
             elif self.end_point.x() > self.ui.gui_widgets['video_label'].width() - 1:
@@ -381,42 +897,91 @@ class MainWindow(QMainWindow):
         # sin necesidad de un QRubberBand
         # Investigar si hay otros rubber bands
         
+        # Última posición pendiente antes de terminar el dibujo
+        self.pointer_coalescer.flush()
+        self.report_pointer_latency()
+
+        if self.edited_box:
+            box_index, handle_name, _, original_box = self.edited_box
+            box = self.current_boxes[box_index].tolist()
+            if box != original_box:
+                self.annotation_journal.record('move' if handle_name == 'move' else 'resize', self.image_number,
+                                               box_index, original_box, box)
+                self.ui.gui_widgets['filmstrip'].invalidate_annotations()
+            self.edited_box = None
+            return
 
         if self.rubberBand:
             self.rubberBand.hide()
 
-            qt_image = self.convert_cv_qt(self.current_image)
-            painter = QtGui.QPainter(qt_image)
-            
             bounding_box = self.image_coordinates(self.start_point, self.end_point)
-            self.current_boxes.append([self.active_class_index, bounding_box[0], bounding_box[1], bounding_box[2], bounding_box[3]])
-
-            for box in self.current_boxes:
-                class_index = box[0]
-                left = int((box[1] - box[3]/2) * self.video_width)
-                top = int((box[2] - box[4]/2) * self.video_height)
-                right = int((box[1] + box[3]/2) * self.video_width)
-                bottom = int((box[2] + box[4]/2) * self.video_height)
-
-                classes = self.project_info['classes']
-                classes_keys = list(classes.keys())
-                color_rgb = QColor.fromString(classes[classes_keys[class_index]])
-                pen = QtGui.QPen()
-                pen.setWidth(1)
-                pen.setColor(color_rgb)
-                painter.setPen(pen)
-
-                if self.box_button_state:
-                    painter.drawRect(QRect(QPoint(left,top), QPoint(right,bottom)))
-
-            painter.end()
-            self.ui.gui_widgets['video_label'].setPixmap(qt_image)
+            # Las anotaciones se guardan en segundo plano, solo se dibuja el nuevo box sobre la imagen
+            self.apply_box_command(self.annotation_journal.execute('add', self.image_number, len(self.current_boxes),
+                                                                   None, [self.active_class_index, *bounding_box]))
+            self.ui.gui_widgets['filmstrip'].invalidate_annotations()
+            self.frame_source.save_frame(self.image_number, self.frames_folder, self.resized_folder)
+
+    def keyPressEvent(self, event):
+        if event.matches(QtGui.QKeySequence.StandardKey.Undo):
+            self.on_undo_button_clicked()
+        elif event.matches(QtGui.QKeySequence.StandardKey.Redo):
+            self.on_redo_button_clicked()
+        elif event.key() == Qt.Key.Key_Delete and self.selected_box is not None and self.annotation_journal is not None:
+            # Borrado del box seleccionado, solo se quita su item y sus celdas del índice
+            self.apply_box_command(self.annotation_journal.execute('delete', self.image_number, self.selected_box,
+                                                                   self.current_boxes[self.selected_box].tolist(), None))
+            self.ui.gui_widgets['filmstrip'].invalidate_annotations()
+        else:
+            super().keyPressEvent(event)
+
+    def report_pointer_latency(self):
+        # Las muestras se quedan en el coalescer si el registro está desactivado
+        if not self.performance_log or self.pointer_coalescer.stats()['updates'] == 0:
+            return
+        ic(self.pointer_coalescer.stats())
+        self.pointer_coalescer.reset()
+
+    def canvas_position(self, event) -> tuple:
+        """ Mouse position relative to the video canvas """
+        return (event.position().x() - self.ui.gui_widgets['video_output_card'].x() - 8,
+                event.position().y() - self.ui.gui_widgets['video_output_card'].y() - 48)
+
+    def box_hit(self, x: float, y: float) -> bool:
+        """ True if there is a box or a box handle at a canvas position """
+        if self.annotation_store is None:
+            return False
+        point_x, point_y = self.ui.gui_widgets['video_label'].normalized_position(x, y)
+        tolerance = self.ui.gui_widgets['video_label'].normalized_distance(HANDLE_TOLERANCE)
+        return bool(self.box_index.handle_at(point_x, point_y, tolerance) or self.box_index.boxes_at(point_x, point_y))
+
+    def start_box_edit(self, x: float, y: float):
+        """ Select the box handle or the smallest box under the mouse """
+        point_x, point_y = self.ui.gui_widgets['video_label'].normalized_position(x, y)
+        tolerance = self.ui.gui_widgets['video_label'].normalized_distance(HANDLE_TOLERANCE)
+        handle = self.box_index.handle_at(point_x, point_y, tolerance)
+        if handle is None:
+            boxes_at = self.box_index.boxes_at(point_x, point_y)
+            if not boxes_at:
+                return
+            handle = (boxes_at[0], 'move')
+        box_index, handle_name = handle
+        original_box = self.current_boxes[box_index].tolist()
+        self.selected_box = box_index
+        self.edited_box = (box_index, handle_name, (point_x, point_y), original_box)
+
+    def move_box_edit(self, x: float, y: float):
+        """ Move or resize the edited box following the mouse """
+        box_index, handle_name, (start_x, start_y), original_box = self.edited_box
+        point_x, point_y = self.ui.gui_widgets['video_label'].normalized_position(x, y)
+        box = edit_box(original_box, handle_name, point_x - start_x, point_y - start_y)
+        self.current_boxes[box_index] = tuple(box)
+        self.annotation_store.update_box(self.image_number, box_index, box)
+        self.ui.gui_widgets['video_label'].update_box(box_index, box)
+        self.box_index.move(box_index, box)
 
     def image_coordinates(self, point_1: QPoint, point_2: QPoint):
-        point_1_x = point_1.x() / self.ui.gui_widgets['video_label'].width()
-        point_1_y = point_1.y() / self.ui.gui_widgets['video_label'].height()
-        point_2_x = point_2.x() / self.ui.gui_widgets['video_label'].width()
-        point_2_y = point_2.y() / self.ui.gui_widgets['video_label'].height()
+        point_1_x, point_1_y = self.ui.gui_widgets['video_label'].normalized_position(point_1.x(), point_1.y())
+        point_2_x, point_2_y = self.ui.gui_widgets['video_label'].normalized_position(point_2.x(), point_2.y())
 
         box_x_center = (point_1_x + point_2_x) / 2
         box_y_center = (point_1_y + point_2_y) / 2
@@ -429,19 +994,61 @@ class MainWindow(QMainWindow):
     # Funciones Opciones
     # ------------------
     def on_minus_button_clicked(self):
-        return None
+        self.ui.gui_widgets['video_label'].zoom_out()
 
     def on_zoom_value_textfield_returnPressed(self):
-        return None
+        self.ui.gui_widgets['video_label'].set_zoom(int(self.ui.gui_widgets['zoom_value_textfield'].text_field.text()))
     
     def on_plus_button_clicked(self):
-        return None
+        self.ui.gui_widgets['video_label'].zoom_in()
+
+    def on_zoom_changed(self, zoom: int):
+        self.ui.gui_widgets['zoom_value_textfield'].text_field.setText(f'{zoom}')
+
+    def full_image(self):
+        """ Imagen en tamaño completo para el zoom """
+        if self.current_image is None:
+            return None
+        return self.frame_source.read_full(self.image_number)
     
     def on_undo_button_clicked(self):
-        return None
+        if self.annotation_journal is not None:
+            self.show_journal_command(self.annotation_journal.undo(), undone=True)
 
     def on_redo_button_clicked(self):
-        return None
+        if self.annotation_journal is not None:
+            self.show_journal_command(self.annotation_journal.redo(), undone=False)
+
+    def show_journal_command(self, command: list, undone: bool) -> None:
+        """ Show the image of an undone or redone edit """
+        if command is None:
+            return
+        self.ui.gui_widgets['filmstrip'].invalidate_annotations()
+        image_number = command[1]
+        if image_number != self.image_number:
+            self.on_filmstrip_frame_selected(image_number)
+        else:
+            self.apply_box_command(inverse_command(command) if undone else command)
+
+    def apply_box_command(self, command: list) -> None:
+        """ Update only the item and the index cells of the box changed by a command of the shown image """
+        _, _, box_index, before, after = command
+        self.current_boxes = self.annotation_store.boxes(self.image_number)
+        if before is None:
+            self.ui.gui_widgets['video_label'].add_box(after, box_index)
+            self.box_index.insert(box_index, after)
+            if self.selected_box is not None and self.selected_box >= box_index:
+                self.selected_box += 1
+        elif after is None:
+            self.ui.gui_widgets['video_label'].remove_box(box_index)
+            self.box_index.remove(box_index)
+            if self.selected_box == box_index:
+                self.selected_box = None
+            elif self.selected_box is not None and self.selected_box > box_index:
+                self.selected_box -= 1
+        else:
+            self.ui.gui_widgets['video_label'].update_box(box_index, after)
+            self.box_index.move(box_index, after)
         
     # ------------------------
     # Funciones Autoetiquetado
@@ -467,16 +1074,20 @@ class MainWindow(QMainWindow):
 
     def on_reverse_button_clicked(self) -> None:
         if self.timer_play.isActive(): self.timer_play.stop()
-        self.timer_reverse.start(self.time_step)
+        self.playback_clock.start(self.image_number, -1)
+        self.timer_reverse.start(self.playback_clock.timer_interval())
 
 
     def on_pause_button_clicked(self) -> None:
-        self.timer_play.stop() if self.timer_play.isActive() else self.timer_reverse.stop()
+        if self.timer_play.isActive() or self.timer_reverse.isActive():
+            self.timer_play.stop() if self.timer_play.isActive() else self.timer_reverse.stop()
+            self.report_playback()
 
 
     def on_play_button_clicked(self) -> None:
         if self.timer_reverse.isActive(): self.timer_reverse.stop()
-        self.timer_play.start(self.time_step)
+        self.playback_clock.start(self.image_number, 1)
+        self.timer_play.start(self.playback_clock.timer_interval())
 
 
     def on_frontFrame_button_clicked(self) -> None:
@@ -485,9 +1096,47 @@ class MainWindow(QMainWindow):
         self.play_forward()
 
 
+    def on_speed_changed(self, index: int) -> None:
+        if self.playback_clock is None or index < 0:
+            return
+        self.playback_clock.set_speed(PLAYBACK_SPEEDS[index])
+        self.update_timer_intervals()
+
+
+    def update_timer_intervals(self) -> None:
+        """ Pace the running playback timer with the playback clock """
+        for timer in (self.timer_play, self.timer_reverse):
+            if timer.isActive():
+                timer.setInterval(self.playback_clock.timer_interval())
+
+
+    def on_filmstrip_frame_selected(self, image_number: int) -> None:
+        self.image_number = image_number
+        self.ui.gui_widgets['video_slider'].setValue(self.image_number)
+        self.ui.gui_widgets['frame_value_textfield'].text_field.setText(f"{self.image_number}")
+        self.draw_frame()
+
+
+    def filmstrip_thumbnail(self, image_number: int):
+        return self.proxy_store.read(image_number) if self.proxy_store is not None else None
+
+
+    def filmstrip_box_count(self, image_number: int) -> int:
+        return self.annotation_store.box_count(image_number) if self.annotation_store is not None else 0
+
+
+    def filmstrip_labeled_images(self) -> list:
+        return self.annotation_store.labeled_images() if self.annotation_store is not None else []
+
+
     def on_video_slider_sliderMoved(self) -> None:
         self.image_number = self.ui.gui_widgets['video_slider'].value()
         self.ui.gui_widgets['frame_value_textfield'].text_field.setText(f"{self.image_number}")
+
+        # Previsualización con la miniatura mientras se arrastra el slider
+        thumbnail = self.proxy_store.read(self.image_number) if self.proxy_store is not None else None
+        if thumbnail is not None:
+            self.ui.gui_widgets['video_label'].set_preview(self.convert_cv_qt(thumbnail))
         
 
     def on_video_slider_sliderReleased(self) -> None:
@@ -495,7 +1144,17 @@ class MainWindow(QMainWindow):
 
 
     def on_frame_value_textfield_returnPressed(self) -> None:
-        self.image_number = int(self.ui.gui_widgets['frame_value_textfield'].text_field.text())
+        text = self.ui.gui_widgets['frame_value_textfield'].text_field.text()
+        if ':' in text:
+            # Tiempo del video original (hh:mm:ss.fff o mm:ss.fff)
+            seconds = sum(float(value) * 60**power for power, value in enumerate(reversed(text.split(':'))))
+            if self.video_index is not None:
+                frame_number = timestamp_frame(self.video_index, seconds * 1000 + frame_timestamp(self.video_index, 0))
+            else:
+                frame_number = round(seconds * self.video_fps)
+            self.image_number = frame_number // max(1, self.project_info['frame_extraction'])
+        else:
+            self.image_number = int(text)
         if self.image_number < 0:
             self.image_number = 0
         elif self.image_number >= self.total_images:
@@ -510,29 +1169,74 @@ class MainWindow(QMainWindow):
     # ---------
     def convert_cv_qt(self, cv_img):
         """Convert from an opencv image to QPixmap"""
-        rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        convert_to_qt_format = QtGui.QImage(rgb_image.data, w, h, bytes_per_line, QtGui.QImage.Format.Format_RGB888)
-        return QPixmap.fromImage(convert_to_qt_format)
+        return self.image_converter.to_qpixmap(cv_img)
 
 
-    def draw_frame(self):
-        frame_text = f'{self.image_number}'.zfill(6)
-        self.current_image = cv2.imread(f"{self.frames_folder}/image_{frame_text}.png")
+    def update_display_size(self):
+        """ Frames are read at the size of the video label """
+        self.frame_source.set_display_size((self.ui.gui_widgets['video_label'].width(),
+                                            self.ui.gui_widgets['video_label'].height()))
+
+
+    def draw_frame(self, direction: int = 0):
+        frame = self.frame_source.read(self.image_number, direction)
+        if frame is None:
+            # Imagen no decodificable, el frame anterior se mantiene
+            self.on_unreadable_image(self.image_number)
+            return
+        self.current_image = frame
         qt_image = self.convert_cv_qt(self.current_image)
         self.ui.gui_widgets['video_label'].setPixmap(qt_image)
+        self.selected_box = None
+        self.refresh_boxes()
+        self.ui.gui_widgets['filmstrip'].set_current(self.image_number)
+
+
+    def on_unreadable_image(self, image_number: int) -> None:
+        """ End the video at the first image that can't be decoded
+
+        The container frame count can be larger than the real one until
+        the packet index corrects it.
+        """
+        if not isinstance(self.frame_source.frame_source, VideoFrameSource) or image_number >= self.total_images:
+            return
+        self.timer_play.stop()
+        self.timer_reverse.stop()
+        self.total_images = image_number
+        self.frame_source.image_count = self.total_images
+        self.ui.gui_widgets['filmstrip'].set_image_count(self.total_images)
+        if self.total_images == 0:
+            self.ui.gui_widgets['video_slider'].setEnabled(False)
+            return
+        self.ui.gui_widgets['video_slider'].setMaximum(self.total_images - 1)
+
+        # Presentación del último frame decodificado
+        self.image_number = self.total_images - 1
+        self.ui.gui_widgets['video_slider'].setValue(self.image_number)
+        self.ui.gui_widgets['frame_value_textfield'].text_field.setText(f"{self.image_number}")
+        self.draw_frame()
+
+
+    def refresh_boxes(self):
+        """ Boxes of the frame from the in-memory annotations """
+        self.current_boxes = self.annotation_store.boxes(self.image_number)
+        if self.selected_box is not None and self.selected_box >= len(self.current_boxes):
+            self.selected_box = None
+        self.ui.gui_widgets['video_label'].set_boxes(self.current_boxes)
+        self.box_index.set_boxes(self.current_boxes)
 
 
     def autobox_detections(self):
         model = YOLO("weights/yolov8m.pt")
 
-        annotated_image = self.current_image.copy()
+        # Detección sobre la imagen en tamaño completo
+        full_image = self.frame_source.read_full(self.image_number)
+        annotated_image = full_image.copy()
         class_filter = [0,1,2,3,5,7]
         ic(class_filter)
         # Run YOLOv8 inference
         results = model(
-            source=self.current_image,
+            source=full_image,
             imgsz=640,
             conf=0.5,
             device=0,
@@ -566,7 +1270,7 @@ class MainWindow(QMainWindow):
     def play_forward(self):
         if (self.image_number < self.total_images - 1):
             self.image_number += 1
-            self.draw_frame()
+            self.draw_frame(1)
 
             self.ui.gui_widgets['video_slider'].setValue(self.image_number)
             self.ui.gui_widgets['frame_value_textfield'].text_field.setText(f"{self.image_number}")
@@ -574,10 +1278,40 @@ class MainWindow(QMainWindow):
             if self.timer_play.isActive(): self.timer_play.stop()
 
 
+    def playback_forward(self):
+        """ Timer tick of the forward playback, paced by the playback clock """
+        self.playback_step(self.timer_play, min(self.playback_clock.next_image(), self.total_images - 1),
+                           self.total_images - 1)
+
+
+    def playback_backward(self):
+        """ Timer tick of the backward playback, paced by the playback clock """
+        self.playback_step(self.timer_reverse, max(self.playback_clock.next_image(), 0), 0)
+
+
+    def playback_step(self, timer: QTimer, image_number: int, last_image: int):
+        # Late images are skipped, so the playback keeps the video speed
+        if image_number != self.image_number:
+            self.image_number = image_number
+            self.draw_frame(self.playback_clock.direction)
+
+            self.ui.gui_widgets['video_slider'].setValue(self.image_number)
+            self.ui.gui_widgets['frame_value_textfield'].text_field.setText(f"{self.image_number}")
+
+        if self.image_number == last_image and timer.isActive():
+            timer.stop()
+            self.report_playback()
+
+
+    def report_playback(self):
+        if self.performance_log:
+            ic(self.playback_clock.stats(), self.frame_source.stats())
+
+
     def play_backward(self):
         if (self.image_number > 0):
             self.image_number -= 1
-            self.draw_frame()
+            self.draw_frame(-1)
 
             self.ui.gui_widgets['video_slider'].setValue(self.image_number)
             self.ui.gui_widgets['frame_value_textfield'].text_field.setText(f"{self.image_number}")
@@ -5,7 +5,8 @@ from components.md3_card import MD3Card
 from components.md3_chip import MD3Chip
 from components.md3_datepicker import MD3DatePicker
 from components.md3_divider import MD3Divider
-from components.md3_imagelabel import MD3ImageLabel
+from components.md3_filmstrip import MD3Filmstrip
+from components.md3_imagecanvas import MD3ImageCanvas
 from components.md3_label import MD3Label
 from components.md3_menu import MD3Menu
 from components.md3_segmentedbutton import MD3SegmentedButton
@@ -93,9 +94,17 @@ class UI(QWidget):
             'width': 164,
             'type': 'outlined',
             'set': -1,
+            'max_items': 10000,
             'language': self.language_value,
             'index_changed': parent.on_projects_changed } )
         
+        self.gui_widgets['project_export_button'] = MD3Button(self.gui_widgets['project_card'], {
+            'position': (60, 88),
+            'type': 'filled',
+            'icon': 'database',
+            'theme_color': self.theme_color,
+            'clicked': parent.on_project_export_button_clicked } )
+
         self.gui_widgets['project_folders_button'] = MD3Button(self.gui_widgets['project_card'], {
             'position': (100, 88),
             'type': 'filled',
@@ -355,6 +364,16 @@ class UI(QWidget):
             'slider_moved': parent.on_video_slider_sliderMoved,
             'slider_released': parent.on_video_slider_sliderReleased } )
 
+        self.gui_widgets['speed_menu'] = MD3Menu(self.gui_widgets['video_toolbar_card'], {
+            'position': (8, 20),
+            'width': 76,
+            'type': 'outlined',
+            'options': {0: ('0.25x', '0.25x'), 1: ('0.5x', '0.5x'), 2: ('1x', '1x'),
+                        3: ('2x', '2x'), 4: ('4x', '4x'), 5: ('8x', '8x')},
+            'set': 2,
+            'language': self.language_value,
+            'index_changed': parent.on_speed_changed } )
+
         self.gui_widgets['frame_value_textfield'] = MD3TextField(self.gui_widgets['video_toolbar_card'], {
             'width': 100,
             'type': 'outlined',
@@ -363,15 +382,28 @@ class UI(QWidget):
             'language': self.language_value,
             'return_pressed': parent.on_frame_value_textfield_returnPressed } )
 
+        # ---------
+        # Filmstrip
+        # ---------
+        self.gui_widgets['filmstrip'] = MD3Filmstrip(parent, {
+            'position': (196, 84),
+            'size': (96, 72),
+            'thumbnail': parent.filmstrip_thumbnail,
+            'box_count': parent.filmstrip_box_count,
+            'labeled_images': parent.filmstrip_labeled_images,
+            'frame_selected': parent.on_filmstrip_frame_selected } )
+
         # ----------------
         # Card Video Image
         # ----------------
         self.gui_widgets['video_output_card'] = MD3Card(parent, {
-            'position': (196, 84),
+            'position': (196, 164),
             'type': 'outlined',
             'titles': ('Salida del Video','Video Output'),
             'language': self.language_value } )
         
-        self.gui_widgets['video_label'] = MD3ImageLabel(self.gui_widgets['video_output_card'], {
+        self.gui_widgets['video_label'] = MD3ImageCanvas(self.gui_widgets['video_output_card'], {
             'position': (8, 48),
-            'scaled_image': True } )
\ No newline at end of file
+            'full_image': parent.full_image,
+            'zoom_changed': parent.on_zoom_changed,
+            'box_hit': parent.box_hit } )
\ No newline at end of file
@@ -0,0 +1,123 @@
+import numpy as np
+
+from tools.annotation_journal import AnnotationJournal
+from tools.annotation_store import AnnotationStore
+from tools.project_database import ProjectDatabase
+
+
+ADDED_BOX = [1, 0.5, 0.5, 0.2, 0.2]
+MOVED_BOX = [1, 0.6, 0.6, 0.2, 0.2]
+
+
+def open_project(project_path):
+    database = ProjectDatabase(project_path)
+    annotation_store = AnnotationStore(database)
+    annotation_store.load()
+    return database, annotation_store, AnnotationJournal(annotation_store, project_path)
+
+
+def crash(database, annotation_store, annotation_journal):
+    """ Stop without the checkpoint of a clean close, discarding the pending writes """
+    annotation_journal.log_file.close()
+    with annotation_store.lock:
+        annotation_store.running = False
+        annotation_store.write_condition.notify()
+    annotation_store.writer_thread.join()
+    database.close()
+
+
+def test_replay_skips_commands_saved_before_the_crash(tmp_path):
+    database, annotation_store, annotation_journal = open_project(tmp_path)
+    annotation_journal.execute('add', 0, 0, None, ADDED_BOX)
+    annotation_journal.execute('move', 0, 0, ADDED_BOX, MOVED_BOX)
+    # Debounced write reached the database
+    annotation_store.flush()
+    crash(database, annotation_store, annotation_journal)
+
+    database, annotation_store, annotation_journal = open_project(tmp_path)
+    assert annotation_journal.replay() == 0
+    boxes = annotation_store.boxes(0)
+    assert len(boxes) == 1
+    np.testing.assert_allclose(boxes[0].tolist(), MOVED_BOX, atol=1e-6)
+    annotation_journal.close()
+    annotation_store.close()
+    database.close()
+
+
+def test_replay_applies_commands_logged_after_the_last_write(tmp_path):
+    database, annotation_store, annotation_journal = open_project(tmp_path)
+    annotation_journal.execute('add', 0, 0, None, ADDED_BOX)
+    annotation_store.flush()
+    annotation_journal.execute('move', 0, 0, ADDED_BOX, MOVED_BOX)
+    annotation_journal.execute('add', 0, 1, None, ADDED_BOX)
+    crash(database, annotation_store, annotation_journal)
+
+    database, annotation_store, annotation_journal = open_project(tmp_path)
+    assert annotation_journal.replay() == 2
+    boxes = annotation_store.boxes(0)
+    np.testing.assert_allclose([box.tolist() for box in boxes], [MOVED_BOX, ADDED_BOX], atol=1e-6)
+    annotation_journal.close()
+    annotation_store.close()
+    database.close()
+
+    # Replayed commands are saved with their sequence number
+    database, annotation_store, annotation_journal = open_project(tmp_path)
+    assert annotation_journal.replay() == 0
+    assert len(annotation_store.boxes(0)) == 2
+    annotation_journal.close()
+    annotation_store.close()
+    database.close()
+
+
+def test_undo_and_redo_follow_the_command_order(tmp_path):
+    database, annotation_store, annotation_journal = open_project(tmp_path)
+    annotation_journal.execute('add', 0, 0, None, ADDED_BOX)
+    annotation_journal.execute('move', 0, 0, ADDED_BOX, MOVED_BOX)
+
+    assert annotation_journal.undo()[0] == 'move'
+    np.testing.assert_allclose(annotation_store.boxes(0)[0].tolist(), ADDED_BOX, atol=1e-6)
+    assert annotation_journal.undo()[0] == 'add'
+    assert len(annotation_store.boxes(0)) == 0
+    assert annotation_journal.undo() is None
+
+    assert annotation_journal.redo()[0] == 'add'
+    assert annotation_journal.redo()[0] == 'move'
+    np.testing.assert_allclose(annotation_store.boxes(0)[0].tolist(), MOVED_BOX, atol=1e-6)
+    assert annotation_journal.redo() is None
+    annotation_journal.close()
+    annotation_store.close()
+    database.close()
+
+
+def test_execute_clears_the_redo_stack(tmp_path):
+    database, annotation_store, annotation_journal = open_project(tmp_path)
+    annotation_journal.execute('add', 0, 0, None, ADDED_BOX)
+    annotation_journal.undo()
+    annotation_journal.execute('add', 0, 0, None, MOVED_BOX)
+
+    assert annotation_journal.redo() is None
+    boxes = annotation_store.boxes(0)
+    assert len(boxes) == 1
+    np.testing.assert_allclose(boxes[0].tolist(), MOVED_BOX, atol=1e-6)
+    annotation_journal.close()
+    annotation_store.close()
+    database.close()
+
+
+def test_checkpoint_saves_the_edits_and_truncates_the_log(tmp_path):
+    database, annotation_store, annotation_journal = open_project(tmp_path)
+    annotation_journal.execute('add', 0, 0, None, ADDED_BOX)
+    annotation_journal.execute('move', 0, 0, ADDED_BOX, MOVED_BOX)
+    assert annotation_journal.path.exists()
+
+    annotation_journal.checkpoint()
+    assert not annotation_journal.path.exists()
+    assert database.journal_sequence() == annotation_journal.sequence == 2
+    np.testing.assert_allclose(database.load_boxes()[0][0].tolist(), MOVED_BOX, atol=1e-6)
+
+    # Commands after the checkpoint start a new log
+    annotation_journal.execute('delete', 0, 0, MOVED_BOX, None)
+    assert len(annotation_journal.path.read_text().splitlines()) == 1
+    annotation_journal.close()
+    annotation_store.close()
+    database.close()
@@ -0,0 +1,210 @@
+"""
+Annotation Journal
+
+This file contains the undo/redo journal of the annotation edits.
+
+Every edit is recorded as a small command with the state of one box
+before and after the edit, never as a snapshot of the annotations:
+
+    [kind, image_number, box_index, before, after]
+
+kind: str
+    'add', 'delete', 'move', 'resize' or 'reclassify'
+before, after: list
+    Box [class_index, x_center, y_center, width, height], None for the
+    missing box of an 'add' (before) or a 'delete' (after)
+
+Undo applies the 'before' state and redo the 'after' state. The undo
+history keeps the last MAX_UNDO commands, so memory use stays flat in
+long sessions.
+
+The journal is also a write-ahead log of the annotation store: every
+command (undo and redo included) is appended to 'journal.log' in the
+project folder with an increasing sequence number, before the debounced
+database write:
+
+    [sequence, kind, image_number, box_index, before, after]
+
+The annotation store saves the sequence number of the last applied
+command in the same transaction as the boxes. When the project is
+opened again after a crash, only the commands logged after that number
+are replayed, so a command is never applied twice. The log is truncated
+at every checkpoint, once the annotation store has written all its
+pending edits.
+"""
+
+import json
+import os
+from collections import deque
+from pathlib import Path
+
+from tools.annotation_store import AnnotationStore
+
+
+JOURNAL_FILE = 'journal.log'
+MAX_UNDO = 1000
+# Logged commands between two checkpoints
+CHECKPOINT_COMMANDS = 1000
+
+INVERSE_KINDS = {'add': 'delete', 'delete': 'add'}
+
+
+class AnnotationJournal:
+    def __init__(self, annotation_store: AnnotationStore, project_path: str, max_undo: int = MAX_UNDO) -> None:
+        """ Undo/redo journal and write-ahead log of the annotation edits
+
+        Parameters
+        ----------
+        annotation_store: AnnotationStore
+            Annotations where the commands are applied
+        project_path: str
+            Project folder where the log is saved
+        max_undo: int
+            Commands kept in the undo history
+        """
+        self.annotation_store = annotation_store
+        self.path = Path(project_path) / JOURNAL_FILE
+        self.undo_stack = deque(maxlen=max_undo)
+        self.redo_stack = deque(maxlen=max_undo)
+        self.logged_commands = 0
+        self.log_file = None
+        # Sequence number of the last logged command
+        self.sequence = annotation_store.sequence
+
+
+    # --------
+    # Recovery
+    # --------
+    def replay(self) -> int:
+        """ Apply the commands logged before a crash and checkpoint
+
+        Commands with a sequence number already saved in the database
+        are skipped, so a log can be replayed more than once.
+
+        Returns
+        -------
+        int
+            Number of replayed commands
+        """
+        replayed = 0
+        saved_sequence = self.annotation_store.sequence
+        if self.path.exists():
+            with open(self.path, 'r') as file:
+                for line in file:
+                    try:
+                        sequence, *command = json.loads(line)
+                    except (json.JSONDecodeError, ValueError):
+                        # Last line interrupted by the crash
+                        break
+                    if sequence <= saved_sequence:
+                        continue
+                    self.apply(command, sequence)
+                    self.sequence = sequence
+                    replayed += 1
+        self.checkpoint()
+        return replayed
+
+
+    def apply(self, command: list, sequence: int) -> None:
+        """ Change a box from its 'before' to its 'after' state """
+        _, image_number, box_index, before, after = command
+        if before is None:
+            self.annotation_store.insert_box(image_number, box_index, after, sequence)
+        elif after is None:
+            self.annotation_store.remove_box(image_number, box_index, sequence)
+        else:
+            self.annotation_store.update_box(image_number, box_index, after, sequence)
+
+
+    # --------
+    # Commands
+    # --------
+    def execute(self, kind: str, image_number: int, box_index: int, before: list, after: list) -> list:
+        """ Log, apply and record an edit, returns the command """
+        command = make_command(kind, image_number, box_index, before, after)
+        self.apply(command, self.log(command))
+        self.push(command)
+        return command
+
+
+    def record(self, kind: str, image_number: int, box_index: int, before: list, after: list) -> None:
+        """ Log and record an edit already applied to the store (a finished box drag) """
+        command = make_command(kind, image_number, box_index, before, after)
+        self.annotation_store.set_sequence(self.log(command))
+        self.push(command)
+
+
+    def push(self, command: list) -> None:
+        self.undo_stack.append(command)
+        self.redo_stack.clear()
+
+
+    def undo(self) -> list:
+        """ Revert the last command, None if there is nothing to undo """
+        if not self.undo_stack:
+            return None
+        command = self.undo_stack.pop()
+        self.apply(inverse_command(command), self.log(inverse_command(command)))
+        self.redo_stack.append(command)
+        return command
+
+
+    def redo(self) -> list:
+        """ Apply the last undone command again, None if there is nothing to redo """
+        if not self.redo_stack:
+            return None
+        command = self.redo_stack.pop()
+        self.apply(command, self.log(command))
+        self.undo_stack.append(command)
+        return command
+
+
+    # ---
+    # Log
+    # ---
+    def log(self, command: list) -> int:
+        """ Append a command to the log before it reaches the annotation store
+
+        Returns
+        -------
+        int
+            Sequence number of the command
+        """
+        # The previous commands are already applied, the new one stays in the log
+        if self.logged_commands >= CHECKPOINT_COMMANDS:
+            self.checkpoint()
+        if self.log_file is None:
+            self.log_file = open(self.path, 'a')
+        self.sequence += 1
+        self.log_file.write(json.dumps([self.sequence] + command) + '\n')
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+        self.logged_commands += 1
+        return self.sequence
+
+
+    def checkpoint(self) -> None:
+        """ Write the pending edits to the database and truncate the log """
+        self.annotation_store.flush()
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+        if self.path.exists():
+            self.path.unlink()
+        self.logged_commands = 0
+
+
+    def close(self) -> None:
+        self.checkpoint()
+
+
+def make_command(kind: str, image_number: int, box_index: int, before, after) -> list:
+    """ Command with the boxes as plain lists """
+    return [kind, int(image_number), int(box_index),
+            None if before is None else [int(before[0])] + [float(value) for value in before[1:]],
+            None if after is None else [int(after[0])] + [float(value) for value in after[1:]]]
+
+
+def inverse_command(command: list) -> list:
+    kind, image_number, box_index, before, after = command
+    return [INVERSE_KINDS.get(kind, kind), image_number, box_index, after, before]
@@ -0,0 +1,249 @@
+"""
+Annotation Store
+
+This file contains the sparse store of the project annotations.
+
+Only images with annotations are kept in memory and in the project
+database (see tools/project_database.py). YOLO label files and CSV
+files are only materialized when the dataset is exported.
+
+Annotations are written in the background: every edit schedules a write
+of its image, which is debounced for WRITE_DELAY seconds so rapid edits
+(dragging or resizing a box) end in a single database transaction.
+Every write saves all the edited images together with the sequence
+number of the last journal command applied (see
+tools/annotation_journal.py), so the database always holds the state
+after a known command.
+Switching images reads the boxes from the in-memory annotations, never
+from disk.
+
+Boxes are stored in YOLO format:
+    [class_index, x_center, y_center, width, height]
+with coordinates normalized to the image size, as one box array per
+image (see tools/box_array.py). Project statistics (class counts) are
+vectorized over the boxes of the whole project.
+"""
+
+import csv
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from tools.box_array import BOX_DTYPE, to_box_array
+from tools.project_database import ProjectDatabase
+
+
+WRITE_DELAY = 0.5
+
+
+class AnnotationStore:
+    def __init__(self, database: ProjectDatabase) -> None:
+        """ Sparse annotations of a project
+
+        Parameters
+        ----------
+        database: ProjectDatabase
+            Project database where the annotations are saved
+        """
+        self.database = database
+        self.annotations = {}
+        # Sequence number of the last journal command applied, and saved
+        self.sequence = 0
+        self.written_sequence = 0
+
+        # image number: time when its boxes are written
+        self.pending_writes = {}
+        self.lock = threading.Lock()
+        # Serializes the writes of the writer thread and flush()
+        self.write_lock = threading.Lock()
+        self.write_condition = threading.Condition(self.lock)
+        self.running = True
+        self.writer_thread = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer_thread.start()
+
+
+    def load(self) -> None:
+        """ Load the annotations from the database """
+        annotations = self.database.load_boxes()
+        sequence = self.database.journal_sequence()
+        with self.lock:
+            self.annotations = annotations
+            self.sequence = self.written_sequence = sequence
+
+
+    def boxes(self, image_number: int) -> np.ndarray:
+        """ Copy of the box array of an image (empty if it has no annotations) """
+        with self.lock:
+            if image_number in self.annotations:
+                return self.annotations[image_number].copy()
+        return np.empty(0, dtype=BOX_DTYPE)
+
+
+    def box_count(self, image_number: int) -> int:
+        return len(self.annotations.get(image_number, ()))
+
+
+    def insert_box(self, image_number: int, box_index: int, box: list, sequence: int = None) -> None:
+        with self.lock:
+            self.annotations[image_number] = np.insert(self.annotations.get(image_number, np.empty(0, dtype=BOX_DTYPE)),
+                                                       box_index, to_box_array([box]))
+            self.schedule_write(image_number, sequence)
+
+
+    def remove_box(self, image_number: int, box_index: int, sequence: int = None) -> None:
+        with self.lock:
+            boxes = np.delete(self.annotations[image_number], box_index)
+            if len(boxes) > 0:
+                self.annotations[image_number] = boxes
+            else:
+                del self.annotations[image_number]
+            self.schedule_write(image_number, sequence)
+
+
+    def update_box(self, image_number: int, box_index: int, box: list, sequence: int = None) -> None:
+        with self.lock:
+            self.annotations[image_number][box_index] = tuple(box)
+            self.schedule_write(image_number, sequence)
+
+
+    def set_sequence(self, sequence: int) -> None:
+        """ Mark a journal command recorded after its edit was applied as applied """
+        with self.lock:
+            self.sequence = sequence
+
+
+    def set_boxes(self, image_number: int, boxes) -> None:
+        with self.lock:
+            if len(boxes) > 0:
+                self.annotations[image_number] = to_box_array(boxes).copy()
+            else:
+                self.annotations.pop(image_number, None)
+            self.schedule_write(image_number)
+
+
+    # ----------
+    # Statistics
+    # ----------
+    def project_boxes(self) -> tuple:
+        """ (image number of every box, box array) of the whole project """
+        with self.lock:
+            image_numbers = sorted(self.annotations)
+            if not image_numbers:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=BOX_DTYPE)
+            counts = [len(self.annotations[image_number]) for image_number in image_numbers]
+            boxes = np.concatenate([self.annotations[image_number] for image_number in image_numbers])
+        return np.repeat(np.array(image_numbers, dtype=np.int64), counts), boxes
+
+
+    def class_counts(self, class_count: int) -> np.ndarray:
+        """ Number of boxes of every class index """
+        _, boxes = self.project_boxes()
+        return np.bincount(boxes['class_index'], minlength=class_count)
+
+
+    def labeled_images(self) -> list:
+        """ Sorted image numbers with annotations """
+        return sorted(self.annotations)
+
+
+    def schedule_write(self, image_number: int, sequence: int = None) -> None:
+        """ Write the boxes of an image WRITE_DELAY seconds after its last edit
+
+        Must be called with the lock held, so the edit and the sequence
+        number of its journal command are written together.
+        """
+        if sequence is not None:
+            self.sequence = sequence
+        self.pending_writes[image_number] = time.monotonic() + WRITE_DELAY
+        self.write_condition.notify()
+
+
+    def write_loop(self) -> None:
+        """ Background thread writing the boxes of the edited images """
+        while True:
+            with self.lock:
+                while self.running:
+                    now = time.monotonic()
+                    next_due = min(self.pending_writes.values(), default=None)
+                    if next_due is not None and next_due <= now:
+                        break
+                    self.write_condition.wait(None if next_due is None else next_due - now)
+                if not self.running:
+                    return
+            self.flush()
+
+
+    def flush(self) -> None:
+        """ Write every pending edit and the journal sequence number in one transaction
+
+        All the edited images are written together, not only the due ones,
+        so the saved sequence number covers every command applied before it.
+        """
+        with self.write_lock:
+            with self.lock:
+                image_boxes = {image_number: self.annotations[image_number].copy() if image_number in self.annotations
+                               else np.empty(0, dtype=BOX_DTYPE) for image_number in self.pending_writes}
+                self.pending_writes.clear()
+                sequence = self.sequence
+            if image_boxes or sequence != self.written_sequence:
+                self.database.replace_boxes(image_boxes, sequence)
+                self.written_sequence = sequence
+
+
+    def close(self) -> None:
+        """ Write the pending edits and stop the writer thread """
+        with self.lock:
+            self.running = False
+            self.write_condition.notify()
+        self.writer_thread.join()
+        self.flush()
+
+
+    def export_yolo(self, export_folder: str, total_images: int, empty_labels: bool = True) -> None:
+        """ Materialize YOLO label files for a dataset export
+
+        Parameters
+        ----------
+        export_folder: str
+            Folder where label files are written
+        total_images: int
+            Number of images of the project
+        empty_labels: bool
+            Write empty label files for images without annotations
+        """
+        export_folder = Path(export_folder)
+        export_folder.mkdir(parents=True, exist_ok=True)
+        image_numbers = range(total_images) if empty_labels else self.labeled_images()
+        for image_number in image_numbers:
+            write_label_file(label_path(export_folder, image_number), self.boxes(image_number))
+
+
+    def export_csv(self, csv_file: str, class_names: list) -> None:
+        """ Write the annotations in a CSV file
+
+        Rows: image_number, class_name, x_center, y_center, width, height
+        """
+        with open(csv_file, 'w', newline='') as file:
+            csv_writer = csv.writer(file)
+            csv_writer.writerow(['image_number', 'class_name', 'x_center', 'y_center', 'width', 'height'])
+            for image_number in self.labeled_images():
+                for class_index, x_center, y_center, width, height in self.boxes(image_number):
+                    csv_writer.writerow([image_number, class_names[class_index], f'{x_center:.6f}',
+                                         f'{y_center:.6f}', f'{width:.6f}', f'{height:.6f}'])
+
+
+def label_path(labeled_folder: Path, image_number: int) -> Path:
+    frame_text = f'{image_number}'.zfill(6)
+    return Path(labeled_folder) / f'image_{frame_text}.txt'
+
+
+def write_label_file(label_file: Path, boxes: list) -> None:
+    """ Write a YOLO label file atomically """
+    temporal_path = f'{label_file}.tmp'
+    with open(temporal_path, 'w') as file:
+        for class_index, x_center, y_center, width, height in boxes:
+            file.write(f'{class_index} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}\n')
+    os.replace(temporal_path, label_file)
@@ -0,0 +1,67 @@
+"""
+Benchmark Qt Image
+
+Micro-benchmark of the OpenCV to QPixmap conversion of displayed frames,
+on 1080p and 4K frames:
+
+RGB888:  previous path (cvtColor BGR2RGB, QImage RGB888, QPixmap copy)
+BGR888:  QImage BGR888 wrapping the array, converted by QPixmap
+RGB32:   ImageConverter.to_qpixmap (BGRA conversion into a Qt allocated QImage)
+
+Run from the repository folder:
+    python -m tools.benchmark_qt_image
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+from PySide6.QtGui import QGuiApplication, QImage, QPixmap
+
+from tools.qt_image import ImageConverter
+
+
+FRAME_SIZES = {'1080p': (1920, 1080), '4K': (3840, 2160)}
+REPETITIONS = 100
+
+
+def rgb888_pixmap(image: np.ndarray) -> QPixmap:
+    """ Previous conversion of MainWindow.convert_cv_qt """
+    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    h, w, ch = rgb_image.shape
+    bytes_per_line = ch * w
+    convert_to_qt_format = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
+    return QPixmap.fromImage(convert_to_qt_format)
+
+
+def bgr888_pixmap(image: np.ndarray) -> QPixmap:
+    height, width = image.shape[:2]
+    return QPixmap.fromImage(QImage(image.data, width, height, image.strides[0], QImage.Format.Format_BGR888))
+
+
+def measure(convert, image: np.ndarray) -> float:
+    """ Mean conversion time in milliseconds """
+    convert(image)
+    start_time = time.perf_counter()
+    for _ in range(REPETITIONS):
+        convert(image)
+    return (time.perf_counter() - start_time) / REPETITIONS * 1000
+
+
+def main() -> None:
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QGuiApplication([])
+
+    converter = ImageConverter()
+    for size_name, (width, height) in FRAME_SIZES.items():
+        image = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+        rgb888_time = measure(rgb888_pixmap, image)
+        bgr888_time = measure(bgr888_pixmap, image)
+        rgb32_time = measure(converter.to_qpixmap, image)
+        print(f'{size_name}: RGB888 {rgb888_time:.2f} ms, BGR888 {bgr888_time:.2f} ms, '
+              f'RGB32 {rgb32_time:.2f} ms ({rgb888_time / rgb32_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Box Array
+
+This file contains the columnar storage of the annotation boxes.
+
+The boxes of an image are a structured NumPy array of BOX_DTYPE, 18
+bytes per box instead of a Python list of five objects, so conversions
+to pixels and class counts are vectorized over every box of an image or
+of the whole project.
+
+Fields (YOLO format, coordinates normalized to the image size):
+    class_index, x_center, y_center, width, height
+"""
+
+import numpy as np
+
+
+BOX_DTYPE = np.dtype([('class_index', '<u2'), ('x_center', '<f4'), ('y_center', '<f4'),
+                      ('width', '<f4'), ('height', '<f4')])
+
+
+def to_box_array(boxes=()) -> np.ndarray:
+    """ Box array from a sequence of boxes [class_index, x_center, y_center, width, height]
+
+    Box arrays are returned as they are, without a copy.
+    """
+    if isinstance(boxes, np.ndarray) and boxes.dtype == BOX_DTYPE:
+        return boxes
+    return np.array([tuple(box) for box in boxes], dtype=BOX_DTYPE)
+
+
+def box_corners(boxes: np.ndarray) -> np.ndarray:
+    """ Normalized (left, top, right, bottom) of every box, shape (n, 4) """
+    half_width, half_height = boxes['width'] / 2, boxes['height'] / 2
+    return np.stack([boxes['x_center'] - half_width, boxes['y_center'] - half_height,
+                     boxes['x_center'] + half_width, boxes['y_center'] + half_height], axis=1)
+
+
+def to_pixels(boxes: np.ndarray, image_width: int, image_height: int) -> np.ndarray:
+    """ (left, top, width, height) in pixels of every box, shape (n, 4) """
+    pixels = box_corners(boxes) * np.array([image_width, image_height, image_width, image_height], dtype=np.float32)
+    pixels[:, 2:] -= pixels[:, :2]
+    return pixels
@@ -0,0 +1,207 @@
+"""
+Box Index
+
+This file contains the spatial index of the boxes of a frame, used to
+hit-test, select and edit boxes with the mouse.
+
+Boxes are indexed in a uniform grid over normalized image coordinates:
+every cell keeps the ids of the boxes that overlap it, so point, nearest
+box and handle queries only check the boxes of a few cells instead of
+every box of the frame. The index is updated incrementally when boxes are
+added, moved or removed.
+
+Methods take and return box positions (the box index of the annotations),
+but the grid is keyed by a stable id given to every box when it is
+indexed. Adding or removing a box only updates the cells of that box,
+the ids of the boxes after it don't change with their position.
+
+Boxes are in YOLO format:
+    [class_index, x_center, y_center, width, height]
+"""
+
+import math
+
+import numpy as np
+
+from tools import box_array
+
+
+GRID_SIZE = 32
+
+HANDLES = {
+    'top_left': (0, 0), 'top': (0.5, 0), 'top_right': (1, 0), 'right': (1, 0.5),
+    'bottom_right': (1, 1), 'bottom': (0.5, 1), 'bottom_left': (0, 1), 'left': (0, 0.5)
+}
+
+
+def box_corners(box: list) -> tuple:
+    """ (left, top, right, bottom) of a YOLO box """
+    _, x_center, y_center, width, height = box
+    return (x_center - width / 2, y_center - height / 2, x_center + width / 2, y_center + height / 2)
+
+
+def edit_box(box: list, handle: str, dx: float, dy: float) -> list:
+    """ Box moved ('move') or resized by one of its handles, clipped to the image
+
+    Parameters
+    ----------
+    box: list
+        Original YOLO box
+    handle: str
+        'move' or a name of HANDLES
+    dx, dy: float
+        Normalized displacement of the mouse
+    """
+    left, top, right, bottom = box_corners(box)
+    if handle == 'move':
+        dx = min(max(dx, -left), 1 - right)
+        dy = min(max(dy, -top), 1 - bottom)
+        left, right, top, bottom = left + dx, right + dx, top + dy, bottom + dy
+    else:
+        handle_x, handle_y = HANDLES[handle]
+        if handle_x == 0:
+            left = min(max(left + dx, 0.0), right)
+        elif handle_x == 1:
+            right = max(min(right + dx, 1.0), left)
+        if handle_y == 0:
+            top = min(max(top + dy, 0.0), bottom)
+        elif handle_y == 1:
+            bottom = max(min(bottom + dy, 1.0), top)
+
+    return [box[0], (left + right) / 2, (top + bottom) / 2, right - left, bottom - top]
+
+
+class BoxIndex:
+    def __init__(self, grid_size: int = GRID_SIZE) -> None:
+        """ Uniform grid index of the boxes of a frame
+
+        Parameters
+        ----------
+        grid_size: int
+            Number of cells per image side
+        """
+        self.grid_size = grid_size
+        # id: (left, top, right, bottom)
+        self.boxes = {}
+        # (column, row): set of ids
+        self.cells = {}
+        # Id of the box at every position
+        self.box_ids = []
+        self.next_id = 0
+
+
+    def cell_range(self, left: float, top: float, right: float, bottom: float) -> tuple:
+        last_cell = self.grid_size - 1
+        return (min(max(int(left * self.grid_size), 0), last_cell), min(max(int(top * self.grid_size), 0), last_cell),
+                min(max(int(right * self.grid_size), 0), last_cell), min(max(int(bottom * self.grid_size), 0), last_cell))
+
+
+    def set_boxes(self, boxes) -> None:
+        """ Index the boxes of a frame (box array or list of boxes) """
+        self.boxes = {}
+        self.cells = {}
+        boxes = box_array.to_box_array(boxes)
+        self.box_ids = list(range(len(boxes)))
+        self.next_id = len(boxes)
+        if len(boxes) == 0:
+            return
+        corners = box_array.box_corners(boxes).astype(np.float64)
+        cell_ranges = np.clip((corners * self.grid_size).astype(np.int64), 0, self.grid_size - 1)
+        for key, (box_corners, (first_column, first_row, last_column, last_row)) in enumerate(
+                zip(corners.tolist(), cell_ranges.tolist())):
+            self.boxes[key] = tuple(box_corners)
+            for row in range(first_row, last_row + 1):
+                for column in range(first_column, last_column + 1):
+                    self.cells.setdefault((column, row), set()).add(key)
+
+
+    def insert(self, box_index: int, box: list) -> None:
+        """ Index a box inserted at a position, the boxes after it move one position up """
+        key = self.next_id
+        self.next_id += 1
+        self.box_ids.insert(box_index, key)
+        self.insert_key(key, box)
+
+
+    def remove(self, box_index: int) -> None:
+        """ Remove the box at a position, the boxes after it move one position down """
+        self.remove_key(self.box_ids.pop(box_index))
+
+
+    def move(self, box_index: int, box: list) -> None:
+        """ Update the cells of a moved or resized box """
+        key = self.box_ids[box_index]
+        self.remove_key(key)
+        self.insert_key(key, box)
+
+
+    def insert_key(self, key: int, box: list) -> None:
+        corners = box_corners(box)
+        self.boxes[key] = corners
+        first_column, first_row, last_column, last_row = self.cell_range(*corners)
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                self.cells.setdefault((column, row), set()).add(key)
+
+
+    def remove_key(self, key: int) -> None:
+        first_column, first_row, last_column, last_row = self.cell_range(*self.boxes.pop(key))
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                cell = self.cells[(column, row)]
+                cell.discard(key)
+                if not cell:
+                    del self.cells[(column, row)]
+
+
+    def position(self, key: int) -> int:
+        """ Current position of the box with an id """
+        return self.box_ids.index(key)
+
+
+    def candidates(self, x: float, y: float, distance: float = 0.0) -> set:
+        """ Ids of the boxes in the cells within distance of a point """
+        first_column, first_row, last_column, last_row = self.cell_range(x - distance, y - distance,
+                                                                         x + distance, y + distance)
+        keys = set()
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                keys |= self.cells.get((column, row), set())
+        return keys
+
+
+    def boxes_at(self, x: float, y: float) -> list:
+        """ Positions of the boxes containing a point, smallest box first """
+        keys = [key for key in self.candidates(x, y)
+                if self.boxes[key][0] <= x <= self.boxes[key][2] and self.boxes[key][1] <= y <= self.boxes[key][3]]
+        keys.sort(key=lambda key: (self.boxes[key][2] - self.boxes[key][0]) * (self.boxes[key][3] - self.boxes[key][1]))
+        return [self.position(key) for key in keys]
+
+
+    def nearest_box(self, x: float, y: float, max_distance: float = 1.0):
+        """ Position of the box with the closest border or interior, None if farther than max_distance """
+        cell_size = 1 / self.grid_size
+        search_distance = cell_size
+        while True:
+            nearest_key, nearest_distance = None, math.inf
+            for key in self.candidates(x, y, min(search_distance, max_distance)):
+                left, top, right, bottom = self.boxes[key]
+                distance = math.hypot(max(left - x, 0, x - right), max(top - y, 0, y - bottom))
+                if distance < nearest_distance:
+                    nearest_key, nearest_distance = key, distance
+            # A box found within the searched cells is the nearest one
+            if nearest_distance <= search_distance or search_distance >= max_distance:
+                return self.position(nearest_key) if nearest_distance <= max_distance else None
+            search_distance *= 2
+
+
+    def handle_at(self, x: float, y: float, tolerance: float):
+        """ (position, handle name) of the box handle within tolerance of a point, None if there isn't any """
+        nearest_handle, nearest_distance = None, tolerance
+        for key in self.candidates(x, y, tolerance):
+            left, top, right, bottom = self.boxes[key]
+            for handle, (handle_x, handle_y) in HANDLES.items():
+                distance = math.hypot(left + handle_x * (right - left) - x, top + handle_y * (bottom - top) - y)
+                if distance <= nearest_distance:
+                    nearest_handle, nearest_distance = (key, handle), distance
+        return (self.position(nearest_handle[0]), nearest_handle[1]) if nearest_handle is not None else None
@@ -0,0 +1,397 @@
+"""
+Extraction
+
+This file contains the frame extraction engine used to sample frames
+from a video file.
+
+Frames are decoded forward in a single pass: skipped frames are only
+demuxed with grab() and kept frames are decoded with retrieve(). Seeking
+is only used when the extraction stride is large enough that jumping to
+the next keyframe is cheaper than grabbing every frame in between.
+
+Every output size of the project is produced from the same decoded
+frame. New sizes can be added later from the full size frames without
+decoding the video again.
+
+For multi-core machines the video can be split into keyframe aligned
+segments that are extracted in a process pool. Every segment writes its
+own image_XXXXXX range, so the output is identical to the serial path.
+"""
+
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import cv2
+
+from tools.image_resize import DEFAULT_OUTPUT_SIZES, create_output_folders, output_folder, resize_image
+from tools.image_writer import ImageWriterPool, encode_parameters, image_path, write_image
+
+
+# Stride (in frames) from which seeking is cheaper than grabbing forward.
+# Typical H.264 traffic cameras use GOPs of 1 - 10 seconds.
+SEEK_THRESHOLD = 250
+
+
+def select_strategy(frame_step: int, seek_threshold: int = SEEK_THRESHOLD) -> str:
+    """ Select the decoding strategy for a given extraction stride
+
+    Parameters
+    ----------
+    frame_step: int
+        Number of source frames between two extracted frames
+    seek_threshold: int
+        Stride from which seeking is cheaper than sequential decoding
+
+    Returns
+    -------
+    str
+        'sequential' or 'seek'
+    """
+    return 'seek' if frame_step >= seek_threshold else 'sequential'
+
+
+def read_frames(cap: cv2.VideoCapture, frame_step: int, start: int = 0, stop: int = None,
+                strategy: str = 'auto', seek_threshold: int = SEEK_THRESHOLD, stats: dict = None):
+    """ Generator of the frames sampled every frame_step frames
+
+    Parameters
+    ----------
+    cap: cv2.VideoCapture
+        Opened video capture
+    frame_step: int
+        Number of source frames between two extracted frames
+    start: int
+        First source frame number to extract
+    stop: int
+        Source frame number where extraction stops (not included).
+        None: until the end of the video
+    strategy: str
+        'auto', 'sequential' or 'seek'
+    seek_threshold: int
+        Stride from which 'auto' strategy switches to seeking
+    stats: dict
+        Optional dictionary updated in place with extraction statistics:
+        strategy, decoded, kept, elapsed and fps (kept frames per second)
+
+    Yields
+    ------
+    tuple
+        (frame_number, frame)
+    """
+    frame_step = max(1, int(frame_step))
+    if strategy == 'auto':
+        strategy = select_strategy(frame_step, seek_threshold)
+    if stats is None:
+        stats = {}
+    stats.update({'strategy': strategy, 'decoded': 0, 'kept': 0, 'elapsed': 0.0, 'fps': 0.0})
+
+    start_time = time.perf_counter()
+    frame_number = start
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    while stop is None or frame_number < stop:
+        if strategy == 'seek':
+            if frame_number != start:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            ret, frame = cap.read()
+            stats['decoded'] += 1
+        else:
+            ret = cap.grab()
+            frame = None
+            if ret and (frame_number - start) % frame_step == 0:
+                ret, frame = cap.retrieve()
+                stats['decoded'] += 1
+        if not ret:
+            break
+
+        if frame is not None:
+            stats['kept'] += 1
+            stats['elapsed'] = time.perf_counter() - start_time
+            stats['fps'] = stats['kept'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+            yield frame_number, frame
+
+        frame_number += frame_step if strategy == 'seek' else 1
+
+    stats['elapsed'] = time.perf_counter() - start_time
+    stats['fps'] = stats['kept'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+
+
+def image_output_sizes(image_settings: dict = None) -> list:
+    """ Output sizes of the resized images """
+    return (image_settings or {}).get('output_sizes') or DEFAULT_OUTPUT_SIZES
+
+
+def write_frame_images(frame, image_number: int, frames_folder: str, resized_folder: str,
+                       image_settings: dict = None, writer: ImageWriterPool = None) -> list:
+    """ Write full size image and resized images of a frame
+
+    All output sizes are produced from the same decoded frame.
+
+    Parameters
+    ----------
+    frame: np.ndarray
+        Decoded frame
+    image_number: int
+        Number of the image
+    frames_folder, resized_folder: str
+        Output folders
+    image_settings: dict
+        Image format, quality and output sizes. None: PNG with default
+        compression resized to 416x416
+    writer: ImageWriterPool
+        Pool where images are encoded and written. None: write synchronously
+
+    Returns
+    -------
+    list
+        Futures of the queued images (empty when writing synchronously)
+    """
+    parameters = encode_parameters(image_settings)
+    outputs = [(frames_folder, frame)]
+    for output_size in image_output_sizes(image_settings):
+        outputs.append((output_folder(resized_folder, output_size), resize_image(frame, output_size)))
+
+    futures = []
+    for folder, image in outputs:
+        path = image_path(folder, image_number, image_settings)
+        if writer is None:
+            write_image(path, image, parameters)
+        else:
+            futures.append(writer.submit(path, image, parameters))
+
+    return futures
+
+
+def resize_frame_file(frame_file: str, image_number: int, resized_folder: str, output_sizes: list,
+                      image_settings: dict = None) -> int:
+    """ Write the missing output sizes of an image from its full size file
+
+    Returns
+    -------
+    int
+        Number of images written
+    """
+    missing_sizes = [output_size for output_size in output_sizes
+                     if not Path(image_path(output_folder(resized_folder, output_size), image_number, image_settings)).exists()]
+    if not missing_sizes:
+        return 0
+
+    frame = cv2.imread(str(frame_file))
+    if frame is None:
+        return 0
+    parameters = encode_parameters(image_settings)
+    for output_size in missing_sizes:
+        path = image_path(output_folder(resized_folder, output_size), image_number, image_settings)
+        write_image(path, resize_image(frame, output_size), parameters)
+
+    return len(missing_sizes)
+
+
+def generate_output_sizes(frames_folder: str, resized_folder: str, output_sizes: list, image_settings: dict = None,
+                          workers: int = None, progress=None) -> int:
+    """ Generate new output sizes from the existing full size frames
+
+    The video is not decoded again. Images that already exist are skipped,
+    so the generation can be repeated to add sizes incrementally.
+
+    Parameters
+    ----------
+    frames_folder: str
+        Folder of the full size images
+    resized_folder: str
+        Root folder of the resized images
+    output_sizes: list
+        Output sizes to generate
+    image_settings: dict
+        Image format and quality of the project
+    workers: int
+        Number of worker threads. None: number of CPU cores
+    progress: def
+        Callback called with the number of processed frames.
+        Returning False cancels the generation
+
+    Returns
+    -------
+    int
+        Number of images written
+    """
+    create_output_folders(resized_folder, output_sizes)
+    extension = Path(image_path(frames_folder, 0, image_settings)).suffix
+    frame_files = sorted(Path(frames_folder).glob(f'image_*{extension}'))
+
+    image_count = 0
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(resize_frame_file, frame_file, int(frame_file.stem.split('_')[1]),
+                                   resized_folder, output_sizes, image_settings) for frame_file in frame_files]
+        for frame_count, future in enumerate(as_completed(futures), start=1):
+            image_count += future.result()
+            if progress is not None and progress(frame_count) is False:
+                for pending in futures:
+                    pending.cancel()
+                break
+
+    return image_count
+
+
+def plan_segments(frame_count: int, frame_step: int, segment_count: int, keyframes: list = None,
+                  image_range: tuple = (0, None)) -> list:
+    """ Split a video into segments that can be extracted independently
+
+    Segment boundaries are multiples of frame_step, so every segment starts
+    on an extracted frame and the image numbering is image = frame // frame_step.
+    When keyframes are known, every boundary is placed on the first
+    extracted frame after a keyframe, so the worker seek is cheap.
+
+    Parameters
+    ----------
+    frame_count: int
+        Total number of frames of the video
+    frame_step: int
+        Number of source frames between two extracted frames
+    segment_count: int
+        Desired number of segments
+    keyframes: list
+        Sorted keyframe numbers of the video (Optional)
+    image_range: tuple
+        (start, stop) image numbers to split. stop None: until the end
+
+    Returns
+    -------
+    list
+        Segments as (start, stop) source frame numbers. The stop of the
+        last segment is None when the range reaches the end of the video
+    """
+    frame_step = max(1, int(frame_step))
+    total_images = -(-frame_count // frame_step)
+    first_image, last_image = image_range
+    open_end = last_image is None or last_image >= total_images
+    if open_end:
+        last_image = max(first_image, total_images)
+    range_images = last_image - first_image
+    segment_count = max(1, min(segment_count, range_images))
+    stop_frame = last_image * frame_step
+
+    boundaries = [first_image * frame_step]
+    for index in range(1, segment_count):
+        boundary = (first_image + range_images * index // segment_count) * frame_step
+        if keyframes:
+            position = bisect_left(keyframes, boundary)
+            keyframe = min(keyframes[max(0, position - 1):position + 1], key=lambda key: abs(key - boundary))
+            boundary = -(-keyframe // frame_step) * frame_step
+        if boundaries[-1] < boundary < stop_frame:
+            boundaries.append(boundary)
+
+    stops = boundaries[1:] + [None if open_end else stop_frame]
+    return list(zip(boundaries, stops))
+
+
+def extract_segment(source_file: str, frames_folder: str, resized_folder: str,
+                    frame_step: int, start: int, stop: int, image_settings: dict = None, cancel_event=None) -> int:
+    """ Extract the frames of a single segment (process pool worker)
+
+    Returns
+    -------
+    int
+        Number of images written
+    """
+    cv2.setNumThreads(1)
+    cap = cv2.VideoCapture(source_file, cv2.CAP_FFMPEG, [cv2.CAP_PROP_N_THREADS, 1])
+    if not cap.isOpened():
+        cap = cv2.VideoCapture(source_file)
+
+    image_count = 0
+    with ImageWriterPool(workers=2, max_pending=8) as writer:
+        for frame_number, frame in read_frames(cap, frame_step, start=start, stop=stop):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            write_frame_images(frame, frame_number // frame_step, frames_folder, resized_folder, image_settings, writer)
+            image_count += 1
+    cap.release()
+
+    return image_count
+
+
+def parallel_extraction(source_file: str, frames_folder: str, resized_folder: str,
+                        frame_step: int, frame_count: int, workers: int = None, keyframes: list = None,
+                        image_settings: dict = None, image_ranges: list = None, segment_done=None,
+                        progress=None) -> int:
+    """ Extract frames splitting the video into segments in a process pool
+
+    Parameters
+    ----------
+    source_file: str
+        Video file path
+    frames_folder, resized_folder: str
+        Output folders
+    frame_step: int
+        Number of source frames between two extracted frames
+    frame_count: int
+        Total number of frames of the video
+    workers: int
+        Number of worker processes. None: number of CPU cores
+    keyframes: list
+        Sorted keyframe numbers used to align the segments (Optional)
+    image_settings: dict
+        Image format and quality. None: PNG with default compression
+    image_ranges: list
+        (start, stop) image ranges to extract. None: the whole video
+    segment_done: def
+        Callback called with (start_image, image_count) when the images
+        of a segment are written
+    progress: def
+        Callback called periodically with the number of images written
+        so far. Returning False cancels extraction
+
+    Returns
+    -------
+    int
+        Number of images written
+    """
+    workers = workers or os.cpu_count() or 1
+    frame_step = max(1, int(frame_step))
+    image_ranges = image_ranges or [(0, None)]
+    total_images = max(1, -(-frame_count // frame_step))
+
+    # More segments than workers balances the load and gives finer progress
+    segments = []
+    for first_image, last_image in image_ranges:
+        range_images = (last_image if last_image is not None else total_images) - first_image
+        segment_count = max(1, round(workers * 4 * range_images / total_images))
+        segments += plan_segments(frame_count, frame_step, segment_count, keyframes, (first_image, last_image))
+
+    image_count = 0
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=workers) as executor:
+        cancel_event = manager.Event()
+        futures = {executor.submit(extract_segment, source_file, str(frames_folder), str(resized_folder),
+                                   frame_step, start, stop, image_settings, cancel_event): start
+                   for start, stop in segments}
+
+        def collect(future) -> None:
+            nonlocal image_count
+            segment_count = future.result()
+            image_count += segment_count
+            if segment_done is not None:
+                segment_done(futures[future] // frame_step, segment_count)
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                collect(future)
+
+            if progress is not None and progress(image_count) is False:
+                cancel_event.set()
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                for future in pending:
+                    if not future.cancelled():
+                        collect(future)
+                break
+
+    return image_count
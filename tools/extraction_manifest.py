@@ -0,0 +1,120 @@
+"""
+Extraction Manifest
+
+This file contains the checkpoint of the frame extraction of a project.
+
+The manifest records the ranges of image numbers that are completely
+written to disk, so an interrupted extraction can resume from the last
+completed image instead of starting over. It is saved atomically in the
+project folder as 'extraction.yaml':
+
+source_file: str
+    Video file path
+frame_extraction: int
+    Number of source frames between two extracted frames
+completed: list
+    Sorted, non overlapping [start, stop) ranges of written images
+finished: bool
+    True when the whole video was extracted
+"""
+
+import os
+from pathlib import Path
+
+import yaml
+
+
+MANIFEST_FILE = 'extraction.yaml'
+
+
+class ExtractionManifest:
+    def __init__(self, project_path: str, source_file: str, frame_extraction: int) -> None:
+        """ Extraction checkpoint of a project
+
+        A manifest written for another video or extraction stride is
+        discarded, so the extraction starts over.
+        """
+        self.path = Path(project_path) / MANIFEST_FILE
+        self.source_file = str(source_file)
+        self.frame_extraction = int(frame_extraction)
+        self.completed = []
+        self.finished = False
+
+        if self.path.exists():
+            with open(self.path, 'r') as file:
+                manifest_data = yaml.safe_load(file) or {}
+            if (manifest_data.get('source_file') == self.source_file and
+                manifest_data.get('frame_extraction') == self.frame_extraction):
+                self.completed = [list(image_range) for image_range in manifest_data.get('completed', [])]
+                self.finished = bool(manifest_data.get('finished', False))
+
+
+    @staticmethod
+    def is_unfinished(project_path: str) -> bool:
+        """ True if the project has an interrupted extraction """
+        manifest_file = Path(project_path) / MANIFEST_FILE
+        if not manifest_file.exists():
+            return False
+        with open(manifest_file, 'r') as file:
+            manifest_data = yaml.safe_load(file) or {}
+        return not manifest_data.get('finished', False)
+
+
+    def add_range(self, start: int, stop: int) -> None:
+        """ Mark images [start, stop) as written """
+        if stop <= start:
+            return
+        merged = []
+        for range_start, range_stop in self.completed:
+            if range_stop < start or range_start > stop:
+                merged.append([range_start, range_stop])
+            else:
+                start, stop = min(start, range_start), max(stop, range_stop)
+        merged.append([start, stop])
+        self.completed = sorted(merged)
+
+
+    def missing_ranges(self, total_images: int) -> list:
+        """ Ranges of images not written yet
+
+        Returns
+        -------
+        list
+            (start, stop) image ranges. The stop of the last range is None,
+            so it is extracted until the end of the video
+        """
+        missing = []
+        position = 0
+        for range_start, range_stop in self.completed:
+            if range_start > position:
+                missing.append((position, range_start))
+            position = max(position, range_stop)
+        if position < total_images or not self.finished:
+            missing.append((position, None))
+
+        return missing
+
+
+    def image_count(self) -> int:
+        return sum(range_stop - range_start for range_start, range_stop in self.completed)
+
+
+    def contiguous_images(self) -> int:
+        """ Number of written images from image 0 """
+        if self.completed and self.completed[0][0] == 0:
+            return self.completed[0][1]
+        return 0
+
+
+    def save(self) -> None:
+        """ Write the manifest atomically """
+        manifest_data = {
+            'source_file': self.source_file,
+            'frame_extraction': self.frame_extraction,
+            'completed': self.completed,
+            'finished': self.finished
+        }
+        temporal_path = self.path.with_suffix('.tmp')
+        with open(temporal_path, 'w') as file:
+            yaml.dump(manifest_data, file)
+        os.replace(temporal_path, self.path)
@@ -0,0 +1,197 @@
+"""
+Frame Cache
+
+This file contains the cache of decoded frames used for playback and
+scrubbing.
+
+FrameCache wraps a frame source (FolderFrameSource or VideoFrameSource)
+with a least recently used cache bounded by memory, and a background
+prefetcher that decodes the next images in the playback direction, or
+around the slider position when scrubbing, before they are displayed.
+The frame source is shared by the GUI thread and the prefetcher, so
+every access to it is serialized with a lock.
+
+Frames are cached at the display size, the size of the widget that
+shows them, so they are resized once instead of on every paint. Full
+size frames are only read on request (zoom, detection) and not cached.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FrameCache:
+    def __init__(self, frame_source, max_bytes: int = 512 * 1024**2, prefetch_count: int = 16) -> None:
+        """ LRU cache of decoded frames with directional prefetch
+
+        Parameters
+        ----------
+        frame_source: FolderFrameSource | VideoFrameSource
+            Source of the project images
+        max_bytes: int
+            Memory cap of the cached frames
+        prefetch_count: int
+            Number of images decoded ahead of the displayed image
+        """
+        self.frame_source = frame_source
+        self.max_bytes = max_bytes
+        self.prefetch_count = prefetch_count
+
+        self.frames = OrderedDict()
+        self.cached_bytes = 0
+        # (width, height) of the cached frames, None for full size
+        self.display_size = None
+        # Images available in the source, frames beyond are not prefetched
+        self.image_count = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+        self.cache_lock = threading.Lock()
+        self.source_lock = threading.Lock()
+        self.prefetch_condition = threading.Condition()
+        self.prefetch_request = None
+        self.stopped = False
+        self.prefetch_thread = threading.Thread(target=self.prefetch_loop, daemon=True)
+        self.prefetch_thread.start()
+
+
+    def read(self, image_number: int, direction: int = 0) -> np.ndarray:
+        """ Cached frame of an image and prefetch of the next ones
+
+        Parameters
+        ----------
+        image_number: int
+            Image to read
+        direction: int
+            1 when playing forward, -1 when playing backward and 0 when
+            scrubbing, to prefetch the images on both sides
+        """
+        with self.cache_lock:
+            frame = self.frames.get(image_number)
+            if frame is not None:
+                self.frames.move_to_end(image_number)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if frame is None:
+            display_size = self.display_size
+            with self.source_lock:
+                frame = self.frame_source.read(image_number, display_size)
+            self.store(image_number, frame, display_size)
+
+        self.prefetch(image_number, direction)
+
+        return frame
+
+
+    def read_full(self, image_number: int) -> np.ndarray:
+        """ Full size frame of an image, read from the source """
+        with self.source_lock:
+            return self.frame_source.read(image_number)
+
+
+    def set_display_size(self, display_size: tuple) -> None:
+        """ Change the size of the cached frames, discarding the cached ones """
+        display_size = tuple(display_size) if display_size is not None else None
+        with self.cache_lock:
+            if display_size == self.display_size:
+                return
+            self.display_size = display_size
+            self.frames.clear()
+            self.cached_bytes = 0
+
+
+    def store(self, image_number: int, frame: np.ndarray, display_size: tuple) -> None:
+        """ Add a frame and evict the least recently used ones over the memory cap """
+        if frame is None:
+            return
+        # Cached frames are shared, so they must not be drawn on
+        frame.flags.writeable = False
+        with self.cache_lock:
+            # Frames read before a display size change are discarded
+            if image_number in self.frames or display_size != self.display_size:
+                return
+            self.frames[image_number] = frame
+            self.cached_bytes += frame.nbytes
+            while self.cached_bytes > self.max_bytes and len(self.frames) > 1:
+                _, evicted_frame = self.frames.popitem(last=False)
+                self.cached_bytes -= evicted_frame.nbytes
+
+
+    def prefetch(self, image_number: int, direction: int = 0) -> None:
+        """ Replace the pending prefetch with the images around image_number """
+        with self.prefetch_condition:
+            self.prefetch_request = (image_number, direction)
+            self.prefetch_condition.notify()
+
+
+    def prefetch_order(self, image_number: int, direction: int) -> list:
+        """ Images to prefetch, the most likely to be displayed first """
+        if direction == 0:
+            offsets = []
+            for offset in range(1, self.prefetch_count // 2 + 1):
+                offsets += [offset, -offset]
+        else:
+            offsets = [direction * offset for offset in range(1, self.prefetch_count + 1)]
+
+        return [image_number + offset for offset in offsets if 0 <= image_number + offset < self.image_count]
+
+
+    def prefetch_loop(self) -> None:
+        while True:
+            with self.prefetch_condition:
+                while self.prefetch_request is None and not self.stopped:
+                    self.prefetch_condition.wait()
+                if self.stopped:
+                    return
+                request = self.prefetch_request
+                self.prefetch_request = None
+
+            for image_number in self.prefetch_order(*request):
+                # A new request (the displayed image changed) restarts the prefetch
+                if self.prefetch_request is not None or self.stopped:
+                    break
+                with self.cache_lock:
+                    if image_number in self.frames:
+                        continue
+                    display_size = self.display_size
+                with self.source_lock:
+                    frame = self.frame_source.read(image_number, display_size)
+                if frame is not None:
+                    self.store(image_number, frame, display_size)
+                    self.prefetched += 1
+
+
+    def stats(self) -> dict:
+        """ Cache hits, misses, hit rate, cached frames and memory """
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests > 0 else 0.0,
+            'prefetched': self.prefetched,
+            'frames': len(self.frames),
+            'cached_bytes': self.cached_bytes
+        }
+
+
+    def save_frame(self, image_number: int, frames_folder: str, resized_folder: str) -> None:
+        with self.source_lock:
+            self.frame_source.save_frame(image_number, frames_folder, resized_folder)
+
+
+    def release(self) -> None:
+        with self.prefetch_condition:
+            self.stopped = True
+            self.prefetch_condition.notify()
+        self.prefetch_thread.join()
+        with self.source_lock:
+            self.frame_source.release()
+        with self.cache_lock:
+            self.frames.clear()
+            self.cached_bytes = 0
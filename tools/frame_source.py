@@ -0,0 +1,170 @@
+"""
+Frame Source
+
+This file contains the frame sources used to display project images.
+
+FolderFrameSource reads the images extracted to the project 'frames'
+folder. VideoFrameSource reads the images on demand directly from the
+source video through a frame index (the frame records of the project
+database) that maps every image number to its source frame number, so
+no images have to be extracted when the project is created.
+
+Both sources read images at full size or, for display, resized to a
+display size. FolderFrameSource decodes the images already reduced by 2,
+4 or 8 when the display is small enough (IMREAD_REDUCED_*), which is
+much faster for JPEG images.
+"""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from tools.extraction import SEEK_THRESHOLD, write_frame_images
+from tools.image_resize import resize_to_display
+from tools.image_writer import image_path
+
+
+REDUCED_READ_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2
+}
+
+
+def build_frame_index(frame_count: int, frame_extraction: int) -> np.ndarray:
+    """ Source frame numbers of the images sampled every frame_extraction frames """
+    return np.arange(0, frame_count, max(1, int(frame_extraction)), dtype=np.int64)
+
+
+def reduced_read_flag(frame_size: tuple, display_size: tuple) -> int:
+    """ imread flag with the largest reduction still bigger than the display """
+    for factor, read_flag in REDUCED_READ_FLAGS.items():
+        if frame_size[0] // factor >= display_size[0] and frame_size[1] // factor >= display_size[1]:
+            return read_flag
+    return cv2.IMREAD_COLOR
+
+
+class FolderFrameSource:
+    def __init__(self, frames_folder: str, image_settings: dict = None, frame_size: tuple = None) -> None:
+        """ Images extracted to the project frames folder
+
+        Parameters
+        ----------
+        frames_folder: str
+            Project frames folder
+        image_settings: dict
+            Image format of the extracted images
+        frame_size: tuple
+            (width, height) of the images, needed for reduced decoding
+        """
+        self.frames_folder = frames_folder
+        self.image_settings = image_settings
+        self.frame_size = frame_size
+
+
+    def read(self, image_number: int, display_size: tuple = None) -> np.ndarray:
+        """ Full size image, or resized to display_size (width, height) """
+        file_path = image_path(self.frames_folder, image_number, self.image_settings)
+        if display_size is None:
+            return cv2.imread(file_path)
+
+        read_flag = reduced_read_flag(self.frame_size, display_size) if self.frame_size else cv2.IMREAD_COLOR
+        image = cv2.imread(file_path, read_flag)
+        return resize_to_display(image, display_size) if image is not None else None
+
+
+    def save_frame(self, image_number: int, frames_folder: str, resized_folder: str) -> None:
+        """ Images are already on disk """
+        return None
+
+
+    def release(self) -> None:
+        return None
+
+
+class VideoFrameSource:
+    def __init__(self, source_file: str, frame_numbers: np.ndarray, video_index: dict = None,
+                 image_settings: dict = None) -> None:
+        """ Images decoded on demand from the source video
+
+        Parameters
+        ----------
+        source_file: str
+            Video file path
+        frame_numbers: np.ndarray
+            Source frame number of every image number
+        video_index: dict
+            Keyframe index of the video (Optional). When available, random
+            access decodes from the nearest keyframe of the target frame
+        image_settings: dict
+            Image format and quality of the images saved when labeling
+        """
+        self.source_file = str(source_file)
+        self.frame_numbers = frame_numbers
+        self.video_index = video_index
+        self.image_settings = image_settings
+        self.cap = cv2.VideoCapture(self.source_file)
+
+        # Source frame number of the next frame returned by cap.read()
+        self.position = 0
+        self.last_image_number = None
+        self.last_frame = None
+
+
+    def read(self, image_number: int, display_size: tuple = None) -> np.ndarray:
+        """ Full size image, or resized to display_size (width, height) """
+        frame = self.read_frame(image_number)
+        if frame is None or display_size is None:
+            return frame
+        return resize_to_display(frame, display_size)
+
+
+    def read_frame(self, image_number: int) -> np.ndarray:
+        if image_number == self.last_image_number:
+            return self.last_frame
+
+        frame_number = int(self.frame_numbers[image_number])
+        distance = frame_number - self.position
+        if self.video_index is not None and frame_number < len(self.video_index['decode_cost']):
+            # Decoding forward is cheaper than decoding from the keyframe
+            seek_cost = int(self.video_index['decode_cost'][frame_number])
+            if self.position >= 0 and 0 <= distance < seek_cost:
+                self.grab_frames(distance)
+            else:
+                keyframe = int(self.video_index['nearest_keyframe'][frame_number])
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+                self.grab_frames(frame_number - keyframe)
+        elif self.position >= 0 and 0 <= distance <= SEEK_THRESHOLD:
+            # Close ahead: decoding forward is cheaper than seeking
+            self.grab_frames(distance)
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        ret, frame = self.cap.read()
+        if not ret:
+            self.position = -1
+            return None
+
+        self.position = frame_number + 1
+        self.last_image_number = image_number
+        self.last_frame = frame
+
+        return frame
+
+
+    def grab_frames(self, frame_count: int) -> None:
+        for _ in range(frame_count):
+            self.cap.grab()
+
+
+    def save_frame(self, image_number: int, frames_folder: str, resized_folder: str) -> None:
+        """ Write the images of a labeled frame if they are not on disk yet """
+        if Path(image_path(frames_folder, image_number, self.image_settings)).exists():
+            return None
+        frame = self.read_frame(image_number)
+        if frame is not None:
+            write_frame_images(frame, image_number, frames_folder, resized_folder, self.image_settings)
+
+
+    def release(self) -> None:
+        self.cap.release()
@@ -0,0 +1,99 @@
+"""
+Image Resize
+
+This file contains the resize modes used to produce the training images
+of a project from the full size frames.
+
+A project declares its output sizes as a list of dictionaries:
+
+size: list
+    Target size [width, height]
+mode: str
+    'stretch':    resize to size without keeping the aspect ratio
+    'letterbox':  fit inside size keeping the aspect ratio and pad borders
+    'short_side': resize the short side to min(size) keeping the aspect ratio
+
+Every output size is saved in its own sub-folder of 'resized', named
+'{width}x{height}_{mode}'.
+"""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+DEFAULT_OUTPUT_SIZES = [{'size': [416, 416], 'mode': 'stretch'}]
+
+# Padding color used by YOLO letterbox resizing
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+def output_folder(resized_folder: str, output_size: dict) -> str:
+    """ Sub-folder of the resized images of an output size """
+    width, height = output_size['size']
+    return f"{resized_folder}/{width}x{height}_{output_size['mode']}"
+
+
+def create_output_folders(resized_folder: str, output_sizes: list) -> None:
+    for output_size in output_sizes:
+        Path(output_folder(resized_folder, output_size)).mkdir(parents=True, exist_ok=True)
+
+
+def resize_image(image: np.ndarray, output_size: dict) -> np.ndarray:
+    """ Resize an image to an output size
+
+    Parameters
+    ----------
+    image: np.ndarray
+        Full size BGR image
+    output_size: dict
+        Target size and resize mode
+
+    Returns
+    -------
+    np.ndarray
+        Resized image
+    """
+    image_height, image_width = image.shape[:2]
+    width, height = output_size['size']
+    mode = output_size['mode']
+
+    if mode == 'stretch':
+        scale = min(width / image_width, height / image_height)
+        return cv2.resize(image, (width, height), interpolation=interpolation(scale))
+
+    if mode == 'short_side':
+        scale = min(width, height) / min(image_width, image_height)
+        new_size = (round(image_width * scale), round(image_height * scale))
+        return cv2.resize(image, new_size, interpolation=interpolation(scale))
+
+    if mode == 'letterbox':
+        scale = min(width / image_width, height / image_height)
+        new_width, new_height = round(image_width * scale), round(image_height * scale)
+        resized_image = cv2.resize(image, (new_width, new_height), interpolation=interpolation(scale))
+        left = (width - new_width) // 2
+        top = (height - new_height) // 2
+        return cv2.copyMakeBorder(resized_image, top, height - new_height - top, left, width - new_width - left,
+                                  cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+
+    raise ValueError(f'Unknown resize mode: {mode}')
+
+
+def resize_to_display(image: np.ndarray, display_size: tuple) -> np.ndarray:
+    """ Shrink an image to the (width, height) of the widget displaying it
+
+    Images that already fit are returned unchanged, the view scales them up
+    to the frame size without storing the enlarged pixels.
+    """
+    image_height, image_width = image.shape[:2]
+    width, height = display_size
+    if image_width <= width and image_height <= height:
+        return image
+    scale = min(width / image_width, height / image_height)
+    return cv2.resize(image, (width, height), interpolation=interpolation(scale))
+
+
+def interpolation(scale: float) -> int:
+    """ INTER_AREA avoids aliasing when shrinking, INTER_LINEAR when enlarging """
+    return cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
@@ -0,0 +1,132 @@
+"""
+Image Writer
+
+This file contains the image formats available for extracted frames and
+a bounded thread pool that encodes and writes images in the background,
+so the decoding loop doesn't wait for PNG/JPEG/WebP encoding.
+
+Image settings are stored in the project metadata as:
+
+image_format: str
+    'png', 'jpeg', 'webp' or 'webp_lossless'
+image_quality: int
+    PNG compression level (0 - 9) or JPEG / WebP quality (0 - 100).
+    None: format default
+output_sizes: list
+    Sizes and resize modes of the resized images (see tools/image_resize.py)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+import cv2
+
+
+IMAGE_FORMATS = {
+    'png': {'extension': 'png', 'parameter': cv2.IMWRITE_PNG_COMPRESSION, 'default': 3},
+    'jpeg': {'extension': 'jpg', 'parameter': cv2.IMWRITE_JPEG_QUALITY, 'default': 95},
+    'webp': {'extension': 'webp', 'parameter': cv2.IMWRITE_WEBP_QUALITY, 'default': 90},
+    'webp_lossless': {'extension': 'webp', 'parameter': cv2.IMWRITE_WEBP_QUALITY, 'default': 101}
+}
+
+DEFAULT_IMAGE_SETTINGS = {'image_format': 'png', 'image_quality': None}
+
+
+def image_path(folder: str, image_number: int, image_settings: dict = None) -> str:
+    """ Path of the image file of an image number """
+    image_settings = image_settings or DEFAULT_IMAGE_SETTINGS
+    extension = IMAGE_FORMATS[image_settings['image_format']]['extension']
+    frame_text = f'{image_number}'.zfill(6)
+    return f'{folder}/image_{frame_text}.{extension}'
+
+
+def encode_parameters(image_settings: dict = None) -> list:
+    """ cv2.imwrite parameters of the image settings """
+    image_settings = image_settings or DEFAULT_IMAGE_SETTINGS
+    image_format = IMAGE_FORMATS[image_settings['image_format']]
+    quality = image_settings.get('image_quality')
+    if quality is None or image_settings['image_format'] == 'webp_lossless':
+        quality = image_format['default']
+
+    return [image_format['parameter'], int(quality)]
+
+
+def write_image(path: str, image, parameters: list = None) -> None:
+    """ Encode and write an image atomically
+
+    The image is written to a temporal file that is renamed when complete,
+    so an interrupted extraction never leaves truncated images.
+    """
+    extension = os.path.splitext(path)[1]
+    ret, buffer = cv2.imencode(extension, image, parameters or [])
+    if not ret:
+        raise OSError(f'Error encoding image {path}')
+
+    temporal_path = f'{path}.tmp'
+    with open(temporal_path, 'wb') as file:
+        file.write(buffer)
+    os.replace(temporal_path, path)
+
+
+class ImageWriterPool:
+    def __init__(self, workers: int = 4, max_pending: int = 16) -> None:
+        """ Bounded thread pool that encodes and writes images
+
+        Parameters
+        ----------
+        workers: int
+            Number of writer threads
+        max_pending: int
+            Maximum number of queued images. submit() blocks when the
+            queue is full, so memory use stays bounded when encoding is
+            slower than decoding
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.errors = []
+
+
+    def submit(self, path: str, image, parameters: list = None):
+        """ Queue an image to be written
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future done when the image is written, its exception() is the
+            writing error of a failed image
+        """
+        self.pending.acquire()
+        future = self.executor.submit(write_image, path, image, parameters or [])
+        future.add_done_callback(self.written)
+
+        return future
+
+
+    def written(self, future) -> None:
+        self.pending.release()
+        if not future.cancelled() and future.exception() is not None:
+            self.errors.append(future.exception())
+
+
+    def shutdown(self) -> None:
+        """ Wait for all pending images """
+        self.executor.shutdown(wait=True)
+
+
+    def close(self) -> None:
+        """ Wait for all pending images and raise the first writing error """
+        self.shutdown()
+        if self.errors:
+            raise self.errors[0]
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.shutdown()
@@ -0,0 +1,107 @@
+"""
+Playback Clock
+
+This file contains the clock that paces video playback.
+
+Images are scheduled from the video fps and the extraction stride, so
+one image is shown every frame_extraction / (fps * speed) seconds. The
+image to display is computed from the elapsed time, not from the number
+of timer ticks: when reading or drawing falls behind, the late images
+are skipped (dropped) instead of slowing down the playback.
+"""
+
+import math
+import time
+
+
+PLAYBACK_SPEEDS = [0.25, 0.5, 1.0, 2.0, 4.0, 8.0]
+
+
+class PlaybackClock:
+    def __init__(self, fps: float, frame_extraction: int = 1, speed: float = 1.0) -> None:
+        """ Frame pacing of the playback
+
+        Parameters
+        ----------
+        fps: float
+            Video frames per second
+        frame_extraction: int
+            Number of source frames between two images
+        speed: float
+            Playback speed multiplier
+        """
+        self.fps = fps if fps > 0 else 30.0
+        self.frame_extraction = max(1, int(frame_extraction))
+        self.speed = speed
+
+        self.direction = 1
+        self.start_time = 0.0
+        self.start_image = 0
+        self.last_image = 0
+        self.shown_images = 0
+        self.dropped_images = 0
+
+
+    def image_interval(self) -> float:
+        """ Seconds between two displayed images """
+        return self.frame_extraction / (self.fps * self.speed)
+
+
+    def timer_interval(self) -> int:
+        """ Timer period in milliseconds, at most one image interval """
+        return max(1, math.floor(self.image_interval() * 1000))
+
+
+    def start(self, image_number: int, direction: int = 1) -> None:
+        """ Start the playback from image_number (direction 1 forward, -1 backward) """
+        self.direction = direction
+        self.start_time = time.perf_counter()
+        self.start_image = image_number
+        self.last_image = image_number
+        self.shown_images = 0
+        self.dropped_images = 0
+
+
+    def set_speed(self, speed: float) -> None:
+        """ Change the speed keeping the current playback position """
+        self.speed = speed
+        if self.start_time > 0:
+            self.start(self.last_image, self.direction)
+
+
+    def set_fps(self, fps: float) -> None:
+        """ Change the video fps (measured from the video index) keeping the current playback position """
+        self.fps = fps if fps > 0 else 30.0
+        if self.start_time > 0:
+            self.start(self.last_image, self.direction)
+
+
+    def next_image(self) -> int:
+        """ Image due at the current time
+
+        Returns
+        -------
+        int
+            Image number to display, equal to the last one if it is not
+            time for a new image yet
+        """
+        elapsed = time.perf_counter() - self.start_time
+        image_number = self.start_image + self.direction * int(elapsed / self.image_interval())
+        skipped = abs(image_number - self.last_image)
+        if skipped > 0:
+            self.shown_images += 1
+            self.dropped_images += skipped - 1
+            self.last_image = image_number
+
+        return image_number
+
+
+    def stats(self) -> dict:
+        """ Target, achieved and dropped images per second """
+        elapsed = time.perf_counter() - self.start_time
+        return {
+            'target_fps': 1 / self.image_interval(),
+            'achieved_fps': self.shown_images / elapsed if elapsed > 0 else 0.0,
+            'dropped_fps': self.dropped_images / elapsed if elapsed > 0 else 0.0,
+            'dropped_images': self.dropped_images
+        }
@@ -0,0 +1,112 @@
+"""
+Pointer Coalescer
+
+This file contains the coalescing of mouse moves used when drawing and
+editing annotations.
+
+High polling rate mice deliver many more move events than the screen
+can show. The coalescer only keeps the latest position and applies it
+at most once per display refresh, so drawing state is updated from the
+latest position only. The time from the applied (latest) event to the
+next paint of the watched widgets is recorded as the input-to-paint
+latency.
+"""
+
+import time
+from collections import deque
+
+import numpy as np
+from PySide6.QtCore import QObject, QTimer, QEvent, Qt
+from PySide6.QtGui import QGuiApplication
+
+
+LATENCY_SAMPLES = 240
+
+
+class PointerCoalescer(QObject):
+    def __init__(self, handler, parent: QObject = None) -> None:
+        """ Mouse moves coalesced to the display refresh rate
+
+        Parameters
+        ----------
+        handler: def
+            Method receiving the latest position (x, y)
+        parent: QObject
+            Parent object (Optional)
+        """
+        super().__init__(parent)
+        self.handler = handler
+
+        screen = QGuiApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen is not None and screen.refreshRate() > 0 else 60.0
+        self.frame_interval = 1 / refresh_rate
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.flush)
+
+        self.position = None
+        self.position_time = None
+        # Time of the event of the last update, until it is painted
+        self.paint_pending_time = None
+        self.last_flush = 0.0
+
+        self.event_count = 0
+        self.update_count = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+
+    def watch(self, widget) -> None:
+        """ Measure the latency until the next paint of a widget """
+        widget.installEventFilter(self)
+
+
+    def push(self, x: float, y: float) -> None:
+        """ New mouse position, applied at the next display refresh """
+        self.position = (x, y)
+        self.position_time = time.perf_counter()
+        self.event_count += 1
+        if not self.timer.isActive():
+            wait = self.last_flush + self.frame_interval - time.perf_counter()
+            self.timer.start(max(0, int(wait * 1000)))
+
+
+    def flush(self) -> None:
+        """ Apply the latest position """
+        self.timer.stop()
+        if self.position is None:
+            return
+        position = self.position
+        self.position = None
+        self.paint_pending_time = self.position_time
+        self.last_flush = time.perf_counter()
+        self.update_count += 1
+        self.handler(*position)
+
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Type.Paint and self.paint_pending_time is not None:
+            self.latencies.append(time.perf_counter() - self.paint_pending_time)
+            self.paint_pending_time = None
+        return False
+
+
+    def stats(self) -> dict:
+        """ Coalesced events and input-to-paint latency in milliseconds """
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'events': self.event_count,
+            'updates': self.update_count,
+            'mean_latency': float(latencies.mean()) if len(latencies) > 0 else 0.0,
+            'p95_latency': float(np.percentile(latencies, 95)) if len(latencies) > 0 else 0.0,
+            'max_latency': float(latencies.max()) if len(latencies) > 0 else 0.0,
+            'late_updates': int(np.sum(latencies > self.frame_interval * 1000)),
+            'frame_interval': self.frame_interval * 1000
+        }
+
+
+    def reset(self) -> None:
+        self.event_count = 0
+        self.update_count = 0
+        self.latencies.clear()
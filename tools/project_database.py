@@ -0,0 +1,217 @@
+"""
+Project Database
+
+This file contains the single file SQLite database of a project
+('project.db' in the project folder).
+
+The database holds the project metadata (video file, extraction
+settings, probed video properties), the class definitions, the frame
+records and the annotations, so opening a project is one database open
+instead of walking its frames and labels folders. YOLO label files and
+CSV files are only export targets.
+
+It runs in WAL mode: the background label writer commits annotation
+changes while the GUI keeps reading, and an interrupted write never
+corrupts the project.
+
+Tables
+------
+metadata: key, value
+    Project data values, JSON encoded
+classes: class_index, name, color
+    Class definitions in menu order
+frames: image_number, frame_number, timestamp
+    Source video frame number of every image and its presentation time
+    in milliseconds, NULL until the video index is built
+boxes: box_id, image_number, class_index, track_id, x_center, y_center, width, height
+    Boxes in YOLO format, track_id is NULL for boxes without a track
+journal: id, sequence
+    Sequence number of the last annotation journal command saved in the
+    boxes table (a single row)
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from tools.box_array import BOX_DTYPE
+
+
+DATABASE_FILE = 'project.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    class_index INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    color TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frames (
+    image_number INTEGER PRIMARY KEY,
+    frame_number INTEGER NOT NULL,
+    timestamp REAL
+);
+CREATE TABLE IF NOT EXISTS boxes (
+    box_id INTEGER PRIMARY KEY,
+    image_number INTEGER NOT NULL,
+    class_index INTEGER NOT NULL,
+    track_id INTEGER,
+    x_center REAL NOT NULL,
+    y_center REAL NOT NULL,
+    width REAL NOT NULL,
+    height REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS boxes_image ON boxes (image_number);
+CREATE INDEX IF NOT EXISTS boxes_class ON boxes (class_index);
+CREATE INDEX IF NOT EXISTS boxes_track ON boxes (track_id) WHERE track_id IS NOT NULL;
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    sequence INTEGER NOT NULL
+);
+"""
+
+
+class ProjectDatabase:
+    def __init__(self, project_path: str) -> None:
+        """ SQLite database of a project, created if it doesn't exist
+
+        The connection is shared by the GUI and the background label
+        writer, every access is serialized by a lock.
+
+        Parameters
+        ----------
+        project_path: str
+            Project folder
+        """
+        self.path = Path(project_path) / DATABASE_FILE
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+    @staticmethod
+    def exists(project_path: str) -> bool:
+        return (Path(project_path) / DATABASE_FILE).exists()
+
+
+    # --------
+    # Metadata
+    # --------
+    def save_metadata(self, project_data: dict) -> None:
+        """ Save the project data, 'classes' ({name: color}) goes to the classes table """
+        with self.lock, self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)',
+                [(key, json.dumps(value)) for key, value in project_data.items() if key != 'classes'])
+            if 'classes' in project_data:
+                self.connection.execute('DELETE FROM classes')
+                self.connection.executemany('INSERT INTO classes (class_index, name, color) VALUES (?, ?, ?)',
+                    [(class_index, name, color) for class_index, (name, color) in enumerate(project_data['classes'].items())])
+
+
+    def load_metadata(self) -> dict:
+        """ Project data with the classes as {name: color} in class index order """
+        with self.lock:
+            project_data = {key: json.loads(value) for key, value in
+                            self.connection.execute('SELECT key, value FROM metadata')}
+            project_data['classes'] = {name: color for name, color in
+                self.connection.execute('SELECT name, color FROM classes ORDER BY class_index')}
+        return project_data
+
+
+    # ------
+    # Frames
+    # ------
+    def set_frames(self, frame_numbers: np.ndarray, timestamps: np.ndarray = None) -> None:
+        """ Replace the frame records with the source frame number of every image
+
+        Parameters
+        ----------
+        frame_numbers: np.ndarray
+            Source frame number of every image
+        timestamps: np.ndarray
+            Presentation time of every image in milliseconds (Optional)
+        """
+        if timestamps is None:
+            timestamps = [None] * len(frame_numbers)
+        else:
+            timestamps = [float(timestamp) for timestamp in timestamps]
+        with self.lock, self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.execute('DELETE FROM frames')
+            self.connection.executemany('INSERT INTO frames (image_number, frame_number, timestamp) VALUES (?, ?, ?)',
+                [(image_number, int(frame_number), timestamp)
+                 for image_number, (frame_number, timestamp) in enumerate(zip(frame_numbers, timestamps))])
+
+
+    def frame_count(self) -> int:
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM frames').fetchone()[0]
+
+
+    # -----
+    # Boxes
+    # -----
+    def load_boxes(self) -> dict:
+        """ Box arrays of every annotated image: {image_number: box array} """
+        with self.lock:
+            rows = self.connection.execute('SELECT image_number, class_index, x_center, y_center, width, height '
+                                           'FROM boxes ORDER BY image_number, box_id').fetchall()
+        if not rows:
+            return {}
+        columns = np.array(rows, dtype=np.float64)
+        boxes = np.empty(len(rows), dtype=BOX_DTYPE)
+        for column, name in enumerate(BOX_DTYPE.names, start=1):
+            boxes[name] = columns[:, column]
+        image_numbers, starts = np.unique(columns[:, 0].astype(np.int64), return_index=True)
+        return dict(zip(image_numbers.tolist(), np.split(boxes, starts[1:])))
+
+
+    def replace_boxes(self, image_boxes: dict, sequence: int = None) -> None:
+        """ Replace the boxes of several images in one transaction
+
+        Parameters
+        ----------
+        image_boxes: dict
+            {image_number: box array}, empty boxes remove the boxes of the image
+        sequence: int
+            Sequence number of the last journal command included in the
+            boxes, saved in the same transaction (Optional)
+        """
+        with self.lock, self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany('DELETE FROM boxes WHERE image_number = ?',
+                                        [(image_number,) for image_number in image_boxes])
+            self.connection.executemany(
+                'INSERT INTO boxes (image_number, class_index, x_center, y_center, width, height) VALUES (?, ?, ?, ?, ?, ?)',
+                [(image_number, *box) for image_number, boxes in image_boxes.items() for box in boxes.tolist()])
+            if sequence is not None:
+                self.connection.execute('INSERT OR REPLACE INTO journal (id, sequence) VALUES (0, ?)', (sequence,))
+
+
+    def journal_sequence(self) -> int:
+        """ Sequence number of the last journal command saved, 0 if there is none """
+        with self.lock:
+            row = self.connection.execute('SELECT sequence FROM journal WHERE id = 0').fetchone()
+        return row[0] if row is not None else 0
+
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
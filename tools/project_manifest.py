@@ -0,0 +1,190 @@
+"""
+Project Manifest
+
+This file contains the small summary of a project used to list and open
+projects without reading their databases or walking their folders.
+
+Every project folder has a 'manifest.json', saved atomically when the
+project is opened and closed:
+
+project_name: str
+video_file: str
+classes: dict
+    {class name: color}
+video: dict
+    width, height, fps and frame_count of the probed video
+frame_extraction: int
+total_images: int
+last_image: int
+    Image shown when the project was closed, restored on open
+labeled_images: int
+    Number of images with boxes
+box_count: int
+class_counts: list
+    Number of boxes of every class index
+
+The projects menu is filled from a local catalog ('projects_cache.json'
+next to the settings) with the manifests of every project folder, so
+the application starts without touching the projects location, which
+may be a network share. The catalog is refreshed in the background by
+scan_projects(), which only reads the manifests modified since the last
+scan.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from tools.annotation_store import AnnotationStore
+from tools.project_database import DATABASE_FILE
+
+
+MANIFEST_FILE = 'manifest.json'
+CATALOG_FILE = 'projects_cache.json'
+
+VIDEO_KEYS = ('width', 'height', 'fps', 'frame_count')
+
+
+def build_manifest(project_info: dict, total_images: int, last_image: int,
+                   annotation_store: AnnotationStore) -> dict:
+    """ Manifest of an open project """
+    classes = project_info['classes']
+    labeled_images = annotation_store.labeled_images()
+    class_counts = annotation_store.class_counts(len(classes))
+    return {
+        'project_name': project_info['project_name'],
+        'video_file': project_info['video_file'],
+        'classes': dict(classes),
+        'video': {key: project_info['video'][key] for key in VIDEO_KEYS if key in project_info.get('video', {})},
+        'frame_extraction': project_info['frame_extraction'],
+        'total_images': int(total_images),
+        'last_image': int(last_image),
+        'labeled_images': len(labeled_images),
+        'box_count': int(class_counts.sum()),
+        'class_counts': class_counts.tolist()
+    }
+
+
+def save_manifest(project_path: str, manifest: dict) -> None:
+    """ Write the manifest of a project atomically """
+    manifest_file = Path(project_path) / MANIFEST_FILE
+    temporal_path = f'{manifest_file}.tmp'
+    with open(temporal_path, 'w') as file:
+        json.dump(manifest, file)
+    os.replace(temporal_path, manifest_file)
+
+
+def load_manifest(project_path: str) -> dict:
+    """ Manifest of a project, None if it doesn't have one """
+    try:
+        with open(Path(project_path) / MANIFEST_FILE, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def folder_key(project_folder: str) -> str:
+    return os.path.normpath(os.path.abspath(project_folder))
+
+
+def scan_projects(project_folder: str, cached_projects: dict) -> dict:
+    """ Catalog entries of the projects of a folder
+
+    Only the manifests modified since they were cached are read. Projects
+    without a manifest yet (closed before their first save) are listed
+    with an empty one.
+
+    Parameters
+    ----------
+    project_folder: str
+        Projects location
+    cached_projects: dict
+        Previous entries {project name: {'mtime': float, 'manifest': dict}}
+
+    Returns
+    -------
+    dict
+        Entries {project name: {'mtime': float, 'manifest': dict}}
+    """
+    projects = {}
+    with os.scandir(project_folder) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            try:
+                mtime = os.stat(Path(entry.path) / MANIFEST_FILE).st_mtime
+            except OSError:
+                if (Path(entry.path) / DATABASE_FILE).exists():
+                    projects[entry.name] = {'mtime': None, 'manifest': {'project_name': entry.name}}
+                continue
+            cached = cached_projects.get(entry.name)
+            if cached is not None and cached['mtime'] == mtime:
+                projects[entry.name] = cached
+                continue
+            manifest = load_manifest(entry.path)
+            if manifest is not None:
+                projects[entry.name] = {'mtime': mtime, 'manifest': manifest}
+    return projects
+
+
+class ProjectCatalog:
+    def __init__(self, catalog_file: str = CATALOG_FILE) -> None:
+        """ Local cache of the manifests of the projects of every projects location
+
+        Parameters
+        ----------
+        catalog_file: str
+            Catalog file path
+        """
+        self.path = Path(catalog_file)
+        # projects location: {project name: {'mtime': float, 'manifest': dict}}
+        self.folders = {}
+        try:
+            with open(self.path, 'r') as file:
+                self.folders = json.load(file)
+        except (OSError, ValueError):
+            self.folders = {}
+
+
+    def projects(self, project_folder: str) -> list:
+        """ Sorted names of the cached projects of a folder """
+        return sorted(self.folders.get(folder_key(project_folder), {}))
+
+
+    def cached_projects(self, project_folder: str) -> dict:
+        return dict(self.folders.get(folder_key(project_folder), {}))
+
+
+    def manifest(self, project_folder: str, project_name: str) -> dict:
+        entry = self.folders.get(folder_key(project_folder), {}).get(project_name)
+        return entry['manifest'] if entry is not None else None
+
+
+    def set_projects(self, project_folder: str, projects: dict) -> None:
+        """ Replace the entries of a folder with the result of a scan """
+        self.folders[folder_key(project_folder)] = projects
+        self.save()
+
+
+    def update(self, project_path: Path, manifest: dict) -> None:
+        """ Cache the manifest just saved in a project folder """
+        project_path = Path(project_path)
+        try:
+            mtime = os.stat(project_path / MANIFEST_FILE).st_mtime
+        except OSError:
+            mtime = None
+        self.folders.setdefault(folder_key(project_path.parent), {})[project_path.name] = {'mtime': mtime, 'manifest': manifest}
+        self.save()
+
+
+    def remove(self, project_folder: str, project_name: str) -> None:
+        """ Forget a project that is no longer in its folder """
+        self.folders.get(folder_key(project_folder), {}).pop(project_name, None)
+        self.save()
+
+
+    def save(self) -> None:
+        temporal_path = f'{self.path}.tmp'
+        with open(temporal_path, 'w') as file:
+            json.dump(self.folders, file)
+        os.replace(temporal_path, self.path)
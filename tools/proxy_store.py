@@ -0,0 +1,96 @@
+"""
+Proxy Store
+
+This file contains the store of the proxy thumbnails shown while
+scrubbing the video slider.
+
+Every image of the project has a tiny, heavily compressed JPEG
+thumbnail, saved in a fixed size slot of a memory mapped array in the
+project folder ('proxy.npy'). Reading a thumbnail only touches its slot,
+so previews are available at the slider drag speed without keeping the
+thumbnails of the whole video in memory. A slot with length 0 is not
+generated yet.
+"""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+PROXY_FILE = 'proxy.npy'
+THUMBNAIL_WIDTH = 160
+SLOT_BYTES = 2048
+# JPEG qualities tried until the thumbnail fits its slot
+THUMBNAIL_QUALITIES = (50, 30, 15)
+
+
+def thumbnail_size(frame_width: int, frame_height: int) -> tuple:
+    return (THUMBNAIL_WIDTH, max(1, round(THUMBNAIL_WIDTH * frame_height / frame_width)))
+
+
+class ProxyStore:
+    def __init__(self, project_path: str, total_images: int) -> None:
+        """ Memory mapped JPEG thumbnails of the project images
+
+        An existing store with another number of images is discarded.
+
+        Parameters
+        ----------
+        project_path: str
+            Project folder
+        total_images: int
+            Number of images of the project
+        """
+        self.path = Path(project_path) / PROXY_FILE
+        proxy_dtype = np.dtype([('length', '<u2'), ('data', 'u1', (SLOT_BYTES,))])
+
+        slots = None
+        if self.path.exists():
+            slots = np.load(self.path, mmap_mode='r+')
+            if slots.shape != (total_images,) or slots.dtype != proxy_dtype:
+                del slots
+                slots = None
+        if slots is None:
+            slots = np.lib.format.open_memmap(self.path, mode='w+', dtype=proxy_dtype, shape=(total_images,))
+        self.slots = slots
+
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+
+    def write(self, image_number: int, thumbnail: np.ndarray) -> None:
+        """ Compress a thumbnail into its slot """
+        for quality in THUMBNAIL_QUALITIES:
+            _, encoded = cv2.imencode('.jpg', thumbnail, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if len(encoded) <= SLOT_BYTES:
+                break
+        else:
+            return
+        self.slots['data'][image_number, :len(encoded)] = encoded.ravel()
+        # The length is written last, so a readable slot is always complete
+        self.slots['length'][image_number] = len(encoded)
+
+
+    def read(self, image_number: int) -> np.ndarray:
+        """ Decoded thumbnail, None if it isn't generated yet """
+        length = int(self.slots['length'][image_number])
+        if length == 0:
+            return None
+        return cv2.imdecode(self.slots['data'][image_number, :length], cv2.IMREAD_COLOR)
+
+
+    def ready_images(self) -> int:
+        """ Number of generated thumbnails from image 0 """
+        missing = np.flatnonzero(self.slots['length'] == 0)
+        return int(missing[0]) if len(missing) > 0 else len(self.slots)
+
+
+    def missing_images(self, image_count: int = None) -> np.ndarray:
+        """ Image numbers without thumbnail among the first image_count images """
+        return np.flatnonzero(self.slots['length'][:image_count] == 0)
+
+
+    def flush(self) -> None:
+        self.slots.flush()
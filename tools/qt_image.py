@@ -0,0 +1,61 @@
+"""
+Qt Image
+
+This file contains the conversion of OpenCV images to Qt images.
+
+OpenCV images are BGR NumPy arrays, which QImage.Format_BGR888 wraps
+without copying or converting colors. A QPixmap, however, is stored in
+the native 32 bit format, so QPixmap.fromImage converts BGR888 images
+pixel by pixel. Displayed frames are instead converted once to BGRA
+directly into the memory of a QImage.Format_RGB32 image allocated by Qt,
+which QPixmap.fromImage takes without converting: displaying a frame
+costs a single copy.
+
+The pixmap memory is owned by Qt, so a converted pixmap stays valid for
+as long as it is referenced.
+"""
+
+import cv2
+import numpy as np
+from PySide6.QtGui import QImage, QPixmap
+
+
+class ImageConverter:
+    def __init__(self) -> None:
+        """ OpenCV to Qt image conversion """
+        # Backing array of the last QImage, it must outlive the QImage
+        self.image_array = None
+
+
+    def to_qimage(self, image: np.ndarray) -> QImage:
+        """ BGR888 QImage sharing the memory of an OpenCV image
+
+        The QImage is valid until the next conversion, use QImage.copy to
+        keep it longer.
+        """
+        if not image.flags['C_CONTIGUOUS']:
+            image = np.ascontiguousarray(image)
+        self.image_array = image
+
+        height, width = image.shape[:2]
+        image_format = QImage.Format.Format_Grayscale8 if image.ndim == 2 else QImage.Format.Format_BGR888
+        return QImage(image.data, width, height, image.strides[0], image_format)
+
+
+    def to_qpixmap(self, image: np.ndarray) -> QPixmap:
+        """ QPixmap of an OpenCV image with a single copy
+
+        The colors are converted into a QImage allocated by Qt, so the
+        pixmap owns its pixels and painting on it doesn't modify the
+        source image.
+        """
+        height, width = image.shape[:2]
+        qimage = QImage(width, height, QImage.Format.Format_RGB32)
+        # BGRA view of the QImage memory, rows are padded to bytesPerLine
+        pixels = np.ndarray((height, width, 4), dtype=np.uint8, buffer=qimage.bits(),
+                            strides=(qimage.bytesPerLine(), 4, 1))
+
+        color_conversion = cv2.COLOR_GRAY2BGRA if image.ndim == 2 else cv2.COLOR_BGR2BGRA
+        cv2.cvtColor(image, color_conversion, dst=pixels)
+
+        return QPixmap.fromImage(qimage)
@@ -0,0 +1,181 @@
+"""
+Video Index
+
+This file contains the per-video index used for fast random access into
+source videos.
+
+The index is built once by demuxing the video packets without decoding
+them and is cached in the project folder. For every source frame number
+it stores:
+
+pts:
+    Presentation timestamp in stream time base units
+timestamp:
+    Presentation time in milliseconds
+keyframe:
+    True if the frame is a keyframe
+nearest_keyframe:
+    Frame number of the keyframe at or before the frame
+decode_cost:
+    Number of frames to decode from nearest_keyframe to reach the frame
+"""
+
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+VIDEO_INDEX_FILE = 'video_index.npz'
+
+
+def scan_video_index(source_file: str, interrupted=None) -> dict:
+    """ Build the frame index of a video reading its packets
+
+    Parameters
+    ----------
+    source_file: str
+        Video file path
+    interrupted: def
+        Callback that returns True to stop the scan (Optional)
+
+    Returns
+    -------
+    dict
+        pts, timestamp, keyframe, nearest_keyframe and decode_cost arrays
+        indexed by source frame number
+    """
+    cap = cv2.VideoCapture(str(source_file), cv2.CAP_FFMPEG)
+    video_index = scan_packets(cap, interrupted)
+    cap.release()
+
+    return video_index
+
+
+def scan_packets(cap: cv2.VideoCapture, interrupted=None) -> dict:
+    """ Build the frame index reading the packets of an opened video
+
+    The capture is switched to raw packets, so it can't be used to decode
+    frames afterwards. An interrupted scan returns None.
+    """
+    # Raw packets are only demuxed, not decoded
+    raw_packets = cap.set(cv2.CAP_PROP_FORMAT, -1)
+
+    pts, timestamp, keyframe = [], [], []
+    while cap.grab():
+        if interrupted is not None and interrupted():
+            return None
+        pts.append(cap.get(cv2.CAP_PROP_PTS))
+        timestamp.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+        keyframe.append(bool(cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)) if raw_packets else True)
+
+    pts = np.array(pts, dtype=np.int64)
+    timestamp = np.array(timestamp, dtype=np.float64)
+    keyframe = np.array(keyframe, dtype=bool)
+    if len(keyframe) > 0:
+        keyframe[0] = True
+
+    # Packets are stored in decoding order, frames are numbered in presentation order
+    order = np.argsort(pts, kind='stable')
+    return build_derived_index(pts[order], timestamp[order], keyframe[order])
+
+
+def build_derived_index(pts: np.ndarray, timestamp: np.ndarray, keyframe: np.ndarray) -> dict:
+    """ Add nearest keyframe and decode cost to the packet arrays """
+    frame_numbers = np.arange(len(keyframe), dtype=np.int64)
+    nearest_keyframe = np.maximum.accumulate(np.where(keyframe, frame_numbers, 0))
+    decode_cost = frame_numbers - nearest_keyframe + 1
+
+    return {
+        'pts': pts,
+        'timestamp': timestamp,
+        'keyframe': keyframe,
+        'nearest_keyframe': nearest_keyframe,
+        'decode_cost': decode_cost
+    }
+
+
+def load_video_index(source_file: str, project_path: str, interrupted=None) -> dict:
+    """ Load the cached video index or build it if the video changed
+
+    Parameters
+    ----------
+    source_file: str
+        Video file path
+    project_path: str
+        Project folder where the index is cached
+    interrupted: def
+        Callback that returns True to stop the scan (Optional)
+
+    Returns
+    -------
+    dict
+        Video index arrays, None if the scan was interrupted
+    """
+    video_index = cached_video_index(source_file, project_path)
+    if video_index is not None:
+        return video_index
+
+    video_index = scan_video_index(source_file, interrupted)
+    if video_index is not None:
+        save_video_index(source_file, project_path, video_index)
+
+    return video_index
+
+
+def cached_video_index(source_file: str, project_path: str) -> dict:
+    """ Cached video index, None if there is none or the video changed """
+    source_stat = Path(source_file).stat()
+    index_file = Path(project_path) / VIDEO_INDEX_FILE
+    if not index_file.exists():
+        return None
+    with np.load(index_file) as cached_index:
+        if (int(cached_index['source_size']) == source_stat.st_size and
+            float(cached_index['source_mtime']) == source_stat.st_mtime):
+            return {key: cached_index[key] for key in cached_index.files
+                    if key not in {'source_size', 'source_mtime'}}
+    return None
+
+
+def save_video_index(source_file: str, project_path: str, video_index: dict) -> None:
+    """ Cache the video index in the project folder
+
+    The file is replaced atomically, so an interrupted save never leaves
+    a damaged index.
+    """
+    source_stat = Path(source_file).stat()
+    index_file = Path(project_path) / VIDEO_INDEX_FILE
+    temporal_path = f'{index_file}.tmp'
+    with open(temporal_path, 'wb') as file:
+        np.savez(file, source_size=source_stat.st_size, source_mtime=source_stat.st_mtime, **video_index)
+    os.replace(temporal_path, index_file)
+
+
+def gop_structure(video_index: dict) -> dict:
+    """ Keyframe count and GOP sizes (frames between keyframes) """
+    keyframe_numbers = np.flatnonzero(video_index['keyframe'])
+    frame_count = len(video_index['keyframe'])
+    gop_sizes = np.diff(np.append(keyframe_numbers, frame_count)) if frame_count > 0 else np.array([0])
+
+    return {
+        'keyframe_count': int(len(keyframe_numbers)),
+        'gop_size': float(gop_sizes.mean()),
+        'max_gop_size': int(gop_sizes.max())
+    }
+
+
+def keyframes(video_index: dict) -> list:
+    """ Sorted keyframe numbers """
+    return np.flatnonzero(video_index['keyframe']).tolist()
+
+
+def frame_timestamp(video_index: dict, frame_numbers):
+    """ Presentation time in milliseconds of a source frame number or array of frame numbers """
+    return video_index['timestamp'][frame_numbers]
+
+
+def timestamp_frame(video_index: dict, timestamp: float) -> int:
+    """ Source frame number displayed at a given time in milliseconds """
+    frame_number = np.searchsorted(video_index['timestamp'], timestamp, side='right') - 1
+    return int(max(0, frame_number))